@@ -4,13 +4,13 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import json
-from pathlib import Path
-import pickle
 
 
 # 설정 가져오기
 from app.config.settings import settings
-from app.rag import retriever, generator
+from app.rag import retriever, answer_cache
+from app.rag.embeddings import get_embeddings
+from app.api.sse import stream_answer_response
 from app.routers import bodypart, user_input
 
 app = FastAPI(title=settings.API_TITLE)
@@ -33,28 +33,63 @@ class SearchReq(BaseModel):
 
     query: str
     top_k: int = 5
+    search_mode: retriever.SearchMode = settings.SEARCH_MODE   # vector | lexical | hybrid
+    mmr: bool = False   # True면 비슷한 제품 중복을 줄인 결과 (vector / hybrid)
 
 
 class RAGReq(SearchReq): pass
 
 @app.post("/rag_search")
 def rag_search(req: RAGReq):
-    ctx = retriever.retrieve(req.query, req.top_k)
-    answer = generator.generate_answer(ctx, req.query)
-    return {"context": [d.page_content for d in ctx], "answer": answer}
+    ctx = retriever.retrieve(req.query, req.top_k, req.search_mode, mmr=req.mmr)
+    answer, cached = answer_cache.generate_answer(ctx, req.query)
+    return {"context": [d.page_content for d in ctx], "answer": answer, "cached": cached}
 
-# 이후 최종적으로 추천된 영양제에 대한 기타 정보들 metadata에서 호출
-IDX_DIR = Path("app/data/faiss_index_supplement")
-META_PKL = IDX_DIR / "index.pkl"
 
-with META_PKL.open("rb") as f:
-    meta_list: list[dict] = pickle.load(f)
+# 스트리밍 버전 (SSE): 검색 문서를 먼저 보내고 답변은 토큰 단위로 전송
+@app.post("/rag_search/stream")
+async def rag_search_stream(req: RAGReq):
+    ctx = await retriever.aretrieve(req.query, req.top_k, req.search_mode, mmr=req.mmr)
+    tokens, cached = await answer_cache.astream_answer(ctx, req.query)
+    return stream_answer_response({"context": [d.page_content for d in ctx], "cached": cached}, tokens)
+
 
-product_index = {str(m["id"]): m for m in meta_list}
+# 여러 질의 일괄 검색 (오프라인 평가 / 다중 성분 조회용)
+class BatchSearchReq(BaseModel):
+    queries: list[str]
+    top_k: int = 5
+    search_mode: retriever.SearchMode = settings.SEARCH_MODE
+    mmr: bool = False
+    generate: bool = False   # True면 질의별 LLM 답변까지 생성
+
+
+@app.post("/rag_search/batch")
+def rag_search_batch(req: BatchSearchReq):
+    # 임베딩 요청 1회 + FAISS 검색 1회로 모든 질의 처리 (lexical 모드는 임베딩 없이 BM25 만)
+    ctx_list = retriever.retrieve_many(req.queries, req.top_k, req.search_mode, mmr=req.mmr)
+    results = []
+    for query, ctx in zip(req.queries, ctx_list):
+        item = {"query": query, "context": [d.page_content for d in ctx]}
+        if req.generate:
+            item["answer"], item["cached"] = answer_cache.generate_answer(ctx, query)
+        results.append(item)
+    return {"results": results}
+
+# 임베딩 / 답변 캐시 적중/미스 현황 확인용
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "embeddings": get_embeddings(retriever.IDX_DIR).stats(),
+        "answers": answer_cache.get_answer_cache().stats(),
+    }
+
+# 이후 최종적으로 추천된 영양제에 대한 기타 정보들 metadata에서 호출
+# 카탈로그를 메모리에 올리지 않고 SQLite 제품 저장소에서 해당 행만 조회
+from app.sql_utils.product_store import get_product_store
 
 @app.get("/product/{product_id}")
 def get_product(product_id: str):
-    product = product_index.get(product_id)
+    product = get_product_store().get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="해당 제품이 없습니다.")
     return {"product": product}
@@ -0,0 +1,39 @@
+## Server-Sent Events 응답 헬퍼
+## 이벤트 순서: context(검색/매칭 결과, LLM 호출 전) → token(답변 조각, 여러 번) → done(전체 답변)
+## 중간에 오류가 나면 error 이벤트를 보내고 스트림 종료
+
+# 라이브러리 모음
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+# context 이벤트를 먼저 보내고, 답변 토큰을 받는 대로 흘려보냄
+async def _answer_events(context: dict, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield sse_event("context", context)
+    parts = []
+    try:
+        async for text in tokens:
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+    except Exception as e:
+        print(f"[SSE] 스트리밍 중 오류: {e}")
+        yield sse_event("error", {"detail": str(e)})
+        return
+    yield sse_event("done", {"answer": "".join(parts)})
+
+
+def stream_answer_response(context: dict, tokens: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _answer_events(context, tokens),
+        media_type="text/event-stream",
+        # 프록시(nginx 등) 버퍼링 방지
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -26,6 +26,58 @@ class Settings(BaseSettings):
     FASTAPI_URL: str = os.getenv("FASTAPI_URL", "")
     api_url: AnyHttpUrl = os.getenv("FASTAPI_URL", "http://localhost:8000")
 
+    # 인덱스 경로
+    SUPPLEMENT_INDEX_DIR: str = os.getenv("SUPPLEMENT_INDEX_DIR", str(BASE_DIR / "app" / "data" / "faiss_index_supplement"))
+    PRODUCT_DB_PATH: str = os.getenv("PRODUCT_DB_PATH", "")   # 비우면 SUPPLEMENT_INDEX_DIR/products.sqlite
+    MSD_INDEX_DIR: str = os.getenv("MSD_INDEX_DIR", R"C:\faiss_index_msd")
+
+    # FAISS 검색 시점 파라미터 (IVF: nprobe, HNSW: efSearch / flat 인덱스는 무시)
+    FAISS_NPROBE: int = int(os.getenv("FAISS_NPROBE", 16))
+    FAISS_EF_SEARCH: int = int(os.getenv("FAISS_EF_SEARCH", 64))
+    # 압축 인덱스(SQ8/PQ) 검색 시 k × 배수만큼 후보를 뽑아 원본 벡터로 재정렬
+    FAISS_REFINE_FACTOR: int = int(os.getenv("FAISS_REFINE_FACTOR", 4))
+
+    # 임베딩 백엔드: "openai"(네트워크) | "local"(CPU 해시 n-gram TF-IDF)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "openai")
+    LOCAL_EMBED_DIM: int = int(os.getenv("LOCAL_EMBED_DIM", 512))
+
+    # OpenAI 호출 rate limit (토큰 버킷, 0 이하면 제한 없음)
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", 500))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", 200000))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "file")   # "memory" | "file"(워커 간 공유)
+    RATE_LIMIT_STATE_PATH: str = os.getenv("RATE_LIMIT_STATE_PATH", str(BASE_DIR / "app" / "data" / "cache" / "rate_limit.json"))
+    RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 5))
+
+    # 임베딩 캐시 설정 (메모리 LRU + 디스크 저장소)
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBED_CACHE_SIZE: int = int(os.getenv("EMBED_CACHE_SIZE", 2048))
+    EMBED_CACHE_PATH: str = os.getenv("EMBED_CACHE_PATH", str(BASE_DIR / "app" / "data" / "cache" / "embeddings.sqlite"))
+    EMBED_CACHE_MAX_MB: int = int(os.getenv("EMBED_CACHE_MAX_MB", 256))
+
+    # LLM 답변 캐시 (질문 + 제품 id + MSD 스니펫 + 인덱스 버전 기준, 메모리 LRU + 디스크 TTL)
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+    ANSWER_CACHE_PATH: str = os.getenv("ANSWER_CACHE_PATH", str(BASE_DIR / "app" / "data" / "cache" / "answers.sqlite"))
+    ANSWER_CACHE_MAX_MB: int = int(os.getenv("ANSWER_CACHE_MAX_MB", 64))        # 0 이면 디스크 캐시 사용 안 함
+    ANSWER_CACHE_TTL: int = int(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))   # 초, 0 이면 만료 없음
+
+    # 기능 매칭: 코사인 상위 2개 점수 차이가 이 값보다 작을 때만 LLM 호출
+    FUNCTION_MATCH_MARGIN: float = float(os.getenv("FUNCTION_MATCH_MARGIN", 0.05))
+    FUNCTION_MATCH_CACHE_SIZE: int = int(os.getenv("FUNCTION_MATCH_CACHE_SIZE", 1024))
+
+    # 추천 프롬프트 컨텍스트 토큰 예산 (제품 + MSD 문서 합계), 문서 1개 최대 토큰, 순위화 시 벡터 유사도 가중치(0~1)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+    CONTEXT_SECTION_MAX_TOKENS: int = int(os.getenv("CONTEXT_SECTION_MAX_TOKENS", 400))
+    CONTEXT_SIM_WEIGHT: float = float(os.getenv("CONTEXT_SIM_WEIGHT", 0.5))
+
+    # 검색 모드 기본값: "vector" | "lexical"(BM25) | "hybrid"(RRF 결합)
+    SEARCH_MODE: str = os.getenv("SEARCH_MODE", "vector")
+    HYBRID_POOL: int = int(os.getenv("HYBRID_POOL", 4))        # hybrid 시 각 검색에서 k × 배수 후보
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", 60))     # RRF 상수 (클수록 하위 순위 영향 증가)
+
+    # MMR 다양화 (검색 시 mmr=True): 관련도 가중치 λ(1이면 일반 검색과 동일), 후보 풀 = k × 배수
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", 0.7))
+    MMR_POOL: int = int(os.getenv("MMR_POOL", 4))
+
 settings = Settings()
 
 print("✅ OPENAI_API_KEY =", os.getenv("OPENAI_API_KEY"))
\ No newline at end of file
@@ -0,0 +1,130 @@
+## LLM 답변 캐시 (메모리 LRU → 디스크 SQLite(TTL) → 실제 LLM 호출)
+## 기능 목록이 닫힌 집합이라 같은 질문 + 같은 제품 + 같은 MSD 스니펫 조합이 반복됨
+## 키: 질문 + 정렬된 제품 id + MSD 스니펫 + 인덱스 버전 + 모델/프롬프트 → 인덱스를 다시 빌드하면 자동 무효화
+
+# 라이브러리 및 설정 가져오기
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
+
+from langchain.schema import Document
+
+from app.config.settings import settings
+from app.rag import generator
+from app.rag.cache import LRUCache, DiskCache
+from app.rag.embeddings import normalize_text
+
+
+class AnswerCache:
+    def __init__(self, memory: LRUCache, disk: DiskCache | None = None, version: str = ""):
+        self.memory = memory
+        self.disk = disk
+        # 인덱스 버전 + 모델 + 프롬프트가 바뀌면 이전 답변은 더 이상 조회되지 않음 (TTL/용량 정리로 삭제)
+        prompt_hash = hashlib.sha256(generator.PROMPT.encode("utf-8")).hexdigest()[:12]
+        self.version = f"{version}:{generator._llm.model_name}:{prompt_hash}"
+
+    # 제품 문서는 id, MSD 등 id 없는 문서는 본문으로 구분 (순서 무관)
+    def key(self, context_docs: List[Document], question: str) -> str:
+        product_ids = sorted({str(d.metadata["id"]) for d in context_docs if d.metadata.get("id") is not None})
+        snippets = sorted(d.page_content for d in context_docs if d.metadata.get("id") is None)
+        raw = "\x00".join([self.version, normalize_text(question), "\x01".join(product_ids), "\x01".join(snippets)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # 디스크에서 찾은 답변은 메모리에도 채움
+    def _from_disk(self, key: str, blob: Optional[bytes]) -> Optional[str]:
+        if blob is None:
+            return None
+        answer = blob.decode("utf-8")
+        self.memory.put(key, answer)
+        return answer
+
+    def get(self, key: str) -> Optional[str]:
+        answer = self.memory.get(key)
+        if answer is None and self.disk is not None:
+            answer = self._from_disk(key, self.disk.get(key))
+        return answer
+
+    def put(self, key: str, answer: str) -> None:
+        if not answer:
+            return
+        self.memory.put(key, answer)
+        if self.disk is not None:
+            self.disk.put(key, answer.encode("utf-8"))
+
+    # 비동기 버전: 메모리 적중은 바로, 디스크(SQLite)는 스레드에서
+    # (메모리 조회는 한 번만 → 적중률 통계가 이중으로 집계되지 않도록 스레드에서는 디스크만 조회)
+    async def aget(self, key: str) -> Optional[str]:
+        answer = self.memory.get(key)
+        if answer is None and self.disk is not None:
+            answer = self._from_disk(key, await asyncio.to_thread(self.disk.get, key))
+        return answer
+
+    async def aput(self, key: str, answer: str) -> None:
+        await asyncio.to_thread(self.put, key, answer)
+
+    # 스트리밍이 끝까지 완료된 답변만 저장 (중간에 끊기면 저장하지 않음)
+    async def _record(self, key: str, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        parts = []
+        async for text in tokens:
+            parts.append(text)
+            yield text
+        await self.aput(key, "".join(parts))
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+async def _replay(answer: str) -> AsyncIterator[str]:
+    yield answer
+
+
+# 프로세스당 하나의 답변 캐시 (디스크 티어는 워커 간 공유)
+@lru_cache(maxsize=1)
+def get_answer_cache() -> AnswerCache:
+    from app.rag.vector_searcher import INDEX_VERSION
+    disk = None
+    if settings.ANSWER_CACHE_MAX_MB > 0:
+        disk = DiskCache(
+            settings.ANSWER_CACHE_PATH,
+            max_bytes=settings.ANSWER_CACHE_MAX_MB * 1024 * 1024,
+            ttl=settings.ANSWER_CACHE_TTL,
+        )
+    return AnswerCache(LRUCache(settings.ANSWER_CACHE_SIZE), disk, INDEX_VERSION)
+
+
+# ── 캐시를 거치는 답변 생성 → (답변, 캐시 적중 여부)
+def generate_answer(context_docs: List[Document], question: str) -> tuple[str, bool]:
+    cache = get_answer_cache()
+    key = cache.key(context_docs, question)
+    answer = cache.get(key)
+    if answer is not None:
+        return answer, True
+    answer = generator.generate_answer(context_docs, question)
+    cache.put(key, answer)
+    return answer, False
+
+
+async def agenerate_answer(context_docs: List[Document], question: str) -> tuple[str, bool]:
+    cache = get_answer_cache()
+    key = cache.key(context_docs, question)
+    answer = await cache.aget(key)
+    if answer is not None:
+        return answer, True
+    answer = await generator.agenerate_answer(context_docs, question)
+    await cache.aput(key, answer)
+    return answer, False
+
+
+# 스트리밍: 적중 시 저장된 답변을 한 번에, 아니면 LLM 토큰을 흘려보내며 완료 후 저장
+async def astream_answer(context_docs: List[Document], question: str) -> tuple[AsyncIterator[str], bool]:
+    cache = get_answer_cache()
+    key = cache.key(context_docs, question)
+    answer = await cache.aget(key)
+    if answer is not None:
+        return _replay(answer), True
+    return cache._record(key, generator.astream_answer(context_docs, question)), False
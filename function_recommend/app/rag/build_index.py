@@ -0,0 +1,178 @@
+## FAISS 인덱스 재생성 스크립트
+## 기존 인덱스의 문서/메타데이터를 그대로 두고, 선택한 임베딩 백엔드로 벡터만 다시 만듦
+##
+## 사용 예 (function_recommend 폴더에서 실행)
+##   python -m app.rag.build_index --kind supplement --backend local \
+##       --src app/data/faiss_index_supplement --out app/data/faiss_index_supplement_local
+##   python -m app.rag.build_index --kind msd --backend local --src C:\faiss_index_msd --out C:\faiss_index_msd_local
+##   python -m app.rag.build_index --kind supplement --index-type ivf_flat --nlist 1024 --reuse-vectors \
+##       --src app/data/faiss_index_supplement --out app/data/faiss_index_supplement_ivf
+##   python -m app.rag.build_index --kind supplement --index-type sq8 --reuse-vectors \
+##       --src app/data/faiss_index_supplement --out app/data/faiss_index_supplement_sq8
+##
+## 압축 타입(sq8 / pq / ivf_pq)은 원본 벡터를 vectors.npy 로 함께 저장 → 검색 시 상위 후보 정확 재정렬
+## 검색 시점 파라미터(nprobe / efSearch)는 settings 의 FAISS_NPROBE / FAISS_EF_SEARCH 로 조절
+
+# 라이브러리 및 설정 가져오기
+import argparse
+import pickle
+from pathlib import Path
+
+import faiss
+import numpy as np
+from tqdm import tqdm
+
+from app.rag.embeddings import build_provider, read_manifest, write_manifest, EmbeddingProvider, HashingEmbeddingProvider
+from app.sql_utils.product_store import build_product_db
+from app.rag.faiss_utils import (
+    INDEX_TYPES, COMPRESSED_TYPES, make_index, clamp_nlist, train_and_add, ensure_direct_map,
+    REFINE_VECTORS_NAME, load_refine_vectors, save_refine_vectors, index_bytes, recall_at_k,
+)
+
+BATCH_SIZE = 256
+
+
+# 1. 원본 인덱스 폴더에서 문서 텍스트 읽기
+def load_supplement_texts(src: Path) -> tuple[list[str], list[dict]]:
+    with open(src / "index.pkl", "rb") as f:
+        metas: list[dict] = pickle.load(f)
+    return [m.get("text", "") for m in metas], metas
+
+
+def load_msd_texts(src: Path):
+    # langchain FAISS.save_local 형식: (docstore, index_to_docstore_id)
+    with open(src / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    ids = [index_to_docstore_id[i] for i in range(len(index_to_docstore_id))]
+    texts = [docstore.search(doc_id).page_content for doc_id in ids]
+    return texts, (docstore, index_to_docstore_id)
+
+
+# 2. 배치 단위 임베딩 → (n, dim) float32
+def embed_corpus(provider: EmbeddingProvider, texts: list[str]) -> np.ndarray:
+    chunks = []
+    for i in tqdm(range(0, len(texts), BATCH_SIZE), desc=f"embedding ({provider.backend})"):
+        chunks.append(np.asarray(provider.embed_documents(texts[i:i + BATCH_SIZE]), dtype=np.float32))
+    return np.ascontiguousarray(np.vstack(chunks))
+
+
+# 기존 인덱스의 원본 벡터 (같은 백엔드로 인덱스 타입만 바꿀 때 재임베딩 생략)
+# 1) refine 용 vectors.npy 가 있으면 그대로 사용 (압축 인덱스의 원본 벡터)
+# 2) 없으면 무손실 인덱스(flat / IVF-Flat / HNSW)에서만 복원, 압축 인덱스에서 복원한 벡터는 손실이 있어 거부
+def reconstruct_vectors(src: Path) -> np.ndarray:
+    refine = load_refine_vectors(src)
+    if refine is not None:
+        return np.ascontiguousarray(refine, dtype=np.float32)
+    src_type = read_manifest(src).get("index_type", "flat")
+    if src_type in COMPRESSED_TYPES:
+        raise SystemExit(
+            f"--reuse-vectors: {src} 는 압축 인덱스({src_type})인데 {REFINE_VECTORS_NAME} 가 없어 "
+            f"원본 벡터를 복원할 수 없습니다. --reuse-vectors 없이 다시 임베딩하세요."
+        )
+    index = ensure_direct_map(faiss.read_index(str(src / "index.faiss")))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def build_faiss(vectors: np.ndarray, args) -> faiss.Index:
+    nlist = clamp_nlist(args.nlist, len(vectors)) if args.index_type.startswith("ivf") else args.nlist
+    index = make_index(
+        vectors.shape[1], args.index_type,
+        nlist=nlist, pq_m=args.pq_m, pq_bits=args.pq_bits,
+        hnsw_m=args.hnsw_m, ef_construction=args.ef_construction,
+    )
+    # IVF 는 direct map 을 같이 저장 → 검색 서버에서 행 번호로 벡터 복원 (MMR / 유사도 정렬)
+    return ensure_direct_map(train_and_add(index, vectors))
+
+
+# 메모리 절감량 + flat 대비 recall@k 출력
+def report(index: faiss.Index, vectors: np.ndarray, args) -> dict:
+    raw = vectors.nbytes
+    size = index_bytes(index)
+    info = {
+        "float32_mb": round(raw / 2**20, 2),
+        "index_mb": round(size / 2**20, 2),
+        "saved_pct": round(100 * (1 - size / raw), 1),
+        f"recall@{args.eval_k}": round(recall_at_k(index, vectors, args.eval_k, args.eval_queries), 4),
+    }
+    if args.index_type in COMPRESSED_TYPES:
+        info[f"recall@{args.eval_k}_refined"] = round(
+            recall_at_k(index, vectors, args.eval_k, args.eval_queries, refine_factor=args.refine_factor), 4
+        )
+    print("📊 인덱스 리포트:", info)
+    return info
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FAISS 인덱스 재생성")
+    ap.add_argument("--kind", choices=["supplement", "msd"], default="supplement")
+    ap.add_argument("--backend", choices=["openai", "local"], default="openai")
+    ap.add_argument("--src", required=True, help="원본 인덱스 폴더 (index.pkl 필요)")
+    ap.add_argument("--out", required=True, help="결과 인덱스 폴더")
+    ap.add_argument("--dim", type=int, default=None, help="local 백엔드 차원 (기본: LOCAL_EMBED_DIM)")
+    ap.add_argument("--reuse-vectors", action="store_true", help="원본 인덱스 벡터 재사용 (같은 백엔드일 때만)")
+    # 인덱스 타입 및 파라미터
+    ap.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    ap.add_argument("--nlist", type=int, default=256, help="IVF 클러스터 수")
+    ap.add_argument("--pq-m", type=int, default=16, help="IVF-PQ 서브벡터 수 (차원의 약수)")
+    ap.add_argument("--pq-bits", type=int, default=8, help="IVF-PQ 서브벡터당 비트 수")
+    ap.add_argument("--hnsw-m", type=int, default=32, help="HNSW 노드당 이웃 수")
+    ap.add_argument("--ef-construction", type=int, default=200, help="HNSW 생성 시 탐색 폭")
+    # 리포트 (recall@k 측정)
+    ap.add_argument("--eval-k", type=int, default=10)
+    ap.add_argument("--eval-queries", type=int, default=500)
+    ap.add_argument("--refine-factor", type=int, default=4, help="압축 인덱스 refine 후보 배수 (리포트용)")
+    args = ap.parse_args()
+
+    src, out = Path(args.src), Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    if args.kind == "supplement":
+        texts, payload = load_supplement_texts(src)
+    else:
+        texts, payload = load_msd_texts(src)
+
+    # 로컬 백엔드는 해당 코퍼스로 IDF를 학습하고 인덱스 폴더에 같이 저장
+    if args.reuse_vectors:
+        if read_manifest(src).get("backend") != args.backend:
+            raise SystemExit("--reuse-vectors 는 원본 인덱스와 같은 백엔드에서만 사용할 수 있습니다.")
+        provider = build_provider(args.backend, src)
+        if args.backend == "local":
+            provider.save(out)
+        vectors = reconstruct_vectors(src)
+    else:
+        if args.backend == "local":
+            provider = HashingEmbeddingProvider(args.dim) if args.dim else build_provider("local")
+            provider.fit(texts).save(out)
+        else:
+            provider = build_provider(args.backend)
+        vectors = embed_corpus(provider, texts)
+
+    index = build_faiss(vectors, args)
+    stats = report(index, vectors, args)
+
+    if args.kind == "supplement":
+        faiss.write_index(index, str(out / "index.faiss"))
+        with open(out / "index.pkl", "wb") as f:
+            pickle.dump(payload, f)
+        build_product_db(out / "products.sqlite", payload)
+    else:
+        from langchain_community.vectorstores import FAISS
+        docstore, index_to_docstore_id = payload
+        FAISS(provider, index, docstore, index_to_docstore_id).save_local(str(out))
+
+    # 압축 인덱스는 refine 용 원본 벡터를 같이 저장 (검색 시 mmap 으로 읽음)
+    if args.index_type in COMPRESSED_TYPES:
+        save_refine_vectors(out, vectors)
+
+    write_manifest(
+        out, provider,
+        dim=int(vectors.shape[1]), count=int(vectors.shape[0]), index_type=args.index_type, report=stats,
+    )
+    print(
+        f"✅ {args.kind} 인덱스 생성 완료: {out} "
+        f"({vectors.shape[0]}건, dim={vectors.shape[1]}, backend={provider.backend}, type={args.index_type})"
+    )
+
+
+if __name__ == "__main__":
+    main()
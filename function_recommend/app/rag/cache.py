@@ -0,0 +1,184 @@
+## 프로세스 내 LRU 캐시 + SQLite 디스크 캐시
+## 임베딩 등 반복 계산 결과를 재사용하기 위한 공용 저장소
+
+# 라이브러리 모음
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional
+
+
+# 1. 메모리 LRU (프로세스 단위)
+class LRUCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# 2. 디스크 캐시 (워커 간 공유, 용량 기준 eviction, ttl 초 지정 시 만료)
+class DiskCache:
+    def __init__(self, path: str | Path, max_bytes: int = 256 * 1024 * 1024, ttl: float | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._conn() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                       key      TEXT PRIMARY KEY,
+                       value    BLOB NOT NULL,
+                       size     INTEGER NOT NULL,
+                       accessed REAL NOT NULL,
+                       expires  REAL
+                   )"""
+            )
+            # expires 컬럼 없이 만들어진 기존 캐시 파일 보정
+            if "expires" not in {r[1] for r in con.execute("PRAGMA table_info(cache)")}:
+                con.execute("ALTER TABLE cache ADD COLUMN expires REAL")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires)")
+            # 전체 크기 누계 (put 마다 SUM(size) 전체 스캔 대신), 트리거로 같은 트랜잭션 안에서 갱신
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            con.execute(
+                "INSERT OR IGNORE INTO cache_meta(id, total) SELECT 0, COALESCE(SUM(size), 0) FROM cache"
+            )
+            con.executescript(
+                """CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache BEGIN
+                       UPDATE cache_meta SET total = total + NEW.size WHERE id = 0;
+                   END;
+                   CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache BEGIN
+                       UPDATE cache_meta SET total = total - OLD.size WHERE id = 0;
+                   END;
+                   CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE OF size ON cache BEGIN
+                       UPDATE cache_meta SET total = total + NEW.size - OLD.size WHERE id = 0;
+                   END;"""
+            )
+
+    # 스레드마다 별도 커넥션 사용 (sqlite3 커넥션은 스레드 간 공유 불가)
+    def _conn(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.con = con
+        return con
+
+    def get(self, key: str) -> Optional[bytes]:
+        con = self._conn()
+        now = time.time()
+        row = con.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        con.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        con = self._conn()
+        found: dict[str, bytes] = {}
+        now = time.time()
+        # SQLite 바인딩 변수 개수 제한 때문에 나눠서 조회
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(con.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({marks}) AND (expires IS NULL OR expires > ?)",
+                [*chunk, now],
+            ).fetchall())
+        if found:
+            con.executemany("UPDATE cache SET accessed = ? WHERE key = ?", [(now, k) for k in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        con = self._conn()
+        # INSERT OR REPLACE 는 기존 행 삭제 시 DELETE 트리거가 돌지 않으므로 UPSERT 로 갱신
+        con.executemany(
+            """INSERT INTO cache(key, value, size, accessed, expires) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET
+                   value = excluded.value, size = excluded.size,
+                   accessed = excluded.accessed, expires = excluded.expires""",
+            [(k, v, len(v), now, expires) for k, v in items.items()],
+        )
+        self._evict(con)
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    # 만료 항목 정리 후, 용량 초과 시 오래 사용되지 않은 항목부터 삭제 (목표: 최대 용량의 90%)
+    def _evict(self, con: sqlite3.Connection) -> None:
+        if self.ttl:
+            con.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        total = self._total(con)
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for key, size in con.execute("SELECT key, size FROM cache ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= target:
+                break
+        con.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+    @staticmethod
+    def _total(con: sqlite3.Connection) -> int:
+        return con.execute("SELECT total FROM cache_meta WHERE id = 0").fetchone()[0]
+
+    def stats(self) -> dict:
+        con = self._conn()
+        count = con.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        total = self._total(con)
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
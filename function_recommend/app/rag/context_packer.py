@@ -0,0 +1,116 @@
+## 추천 프롬프트용 컨텍스트 순위화 + 토큰 예산 패킹
+## 매칭 제품이 많아도 프롬프트 크기가 CONTEXT_TOKEN_BUDGET 안에서 유지되도록
+##   1) 성분 커버리지 + 질의 벡터 유사도로 후보 순위화 (NumPy 벡터 연산)
+##   2) 긴 본문은 CONTEXT_SECTION_MAX_TOKENS 로 자르고
+##   3) MSD 주의사항을 먼저 넣은 뒤 남은 예산을 상위 제품부터 채움
+
+# 라이브러리 및 설정 가져오기
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain.schema import Document
+
+from app.config.settings import settings
+from app.rag.generator import LLM_MODEL
+from app.rag.rate_limiter import estimate_tokens
+
+
+# ── 1. 로컬 토큰 계산 (tiktoken 이 없거나 인코딩 파일을 못 받으면 근사치 사용)
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(LLM_MODEL)
+        except KeyError:        # 모델을 모르는 구버전 tiktoken
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:      # 오프라인 등으로 인코딩 파일 다운로드 실패
+        print(f"⚠️ tiktoken 인코딩 로드 실패 → 근사 토큰 수 사용: {e}")
+        return None
+
+
+# 서비스 시작 시 호출 → 인코딩 파일 다운로드/로드를 첫 요청이 부담하지 않도록
+def warm_encoding() -> bool:
+    return _encoding() is not None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text)) if enc is not None else estimate_tokens(text)
+
+
+# 최대 토큰 수에 맞게 자르고 말줄임표 추가
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+    enc = _encoding()
+    if enc is not None:
+        return enc.decode(enc.encode(text)[:max_tokens]).rstrip() + "…"
+    # 근사치 기준(약 2자당 1토큰)과 같은 비율로 자름
+    return text[:max_tokens * 2].rstrip() + "…"
+
+
+# ── 2. 후보 순위화
+# 질의 벡터와 후보 벡터들의 코사인 유사도 (n,)
+def cosine_scores(vectors: np.ndarray, query: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vectors, dtype=np.float32)
+    q = np.asarray(query, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=1) * (np.linalg.norm(q) or 1.0)
+    return (v @ q) / np.where(norms > 0, norms, 1.0)
+
+
+# coverage: (n, m) 후보별 요청 성분 포함 여부, sims: (n,) 유사도 → 점수 내림차순 위치
+def rank_candidates(
+    coverage: np.ndarray,
+    sims: Optional[np.ndarray] = None,
+    sim_weight: float = settings.CONTEXT_SIM_WEIGHT,
+) -> np.ndarray:
+    cov = np.asarray(coverage, dtype=np.float32)
+    score = cov.mean(axis=1) if cov.ndim == 2 and cov.shape[1] else np.zeros(len(cov), dtype=np.float32)
+    if sims is not None and len(sims):
+        s = np.asarray(sims, dtype=np.float32)
+        span = s.max() - s.min()
+        # 유사도는 후보 안에서 0~1 로 맞춘 뒤 가중 합
+        s = (s - s.min()) / span if span > 0 else np.zeros_like(s)
+        score = (1 - sim_weight) * score + sim_weight * s
+    # 동점이면 기존 순서 유지
+    return np.argsort(-score, kind="stable")
+
+
+# ── 3. 토큰 예산 패킹
+def _truncated(doc: Document, max_tokens: int) -> tuple[Document, int]:
+    text = truncate_tokens(doc.page_content, max_tokens)
+    doc = doc if text == doc.page_content else Document(page_content=text, metadata=doc.metadata)
+    # 제품명 목록 줄(build_prompt)도 함께 계산
+    name = doc.metadata.get("name")
+    return doc, count_tokens(text) + (count_tokens(str(name)) + 2 if name else 0)
+
+
+def pack_documents(
+    ranked_docs: List[Document],
+    reserved_docs: List[Document] = (),
+    budget: int = settings.CONTEXT_TOKEN_BUDGET,
+    section_tokens: int = settings.CONTEXT_SECTION_MAX_TOKENS,
+) -> List[Document]:
+    picked, reserved, used = [], [], 0
+    # MSD 주의사항 등 반드시 넣을 문서를 먼저 배치
+    for doc in reserved_docs:
+        doc, cost = _truncated(doc, section_tokens)
+        reserved.append(doc)
+        used += cost
+    # 남은 예산 안에서 순위 높은 제품부터 (넘치는 문서는 건너뛰고 더 짧은 다음 문서 시도)
+    # 예산이 다 차면 나머지 문서는 토큰화하지 않고 중단 (제품은 최소 1개 포함)
+    for doc in ranked_docs:
+        if picked and used >= budget:
+            break
+        doc, cost = _truncated(doc, section_tokens)
+        if picked and used + cost > budget:
+            continue
+        picked.append(doc)
+        used += cost
+    print(f"[Context] {len(picked)}/{len(ranked_docs)} docs + {len(reserved)} reserved, ~{used} tokens (budget {budget})")
+    return picked + reserved
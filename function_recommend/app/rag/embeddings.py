@@ -0,0 +1,265 @@
+## 임베딩 백엔드 + 2단계 캐시 (메모리 LRU → 디스크 SQLite → 실제 임베딩 호출)
+## 백엔드는 settings.EMBEDDING_BACKEND 로 선택 ("openai" | "local")
+## 인덱스 폴더마다 embedding.json 으로 어떤 백엔드로 만들었는지 기록
+
+# 라이브러리 및 설정 가져오기
+import abc
+import asyncio
+import hashlib
+import json
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config.settings import settings
+from app.rag.cache import LRUCache, DiskCache
+from app.rag.rate_limiter import get_rate_limiter, estimate_tokens
+
+MANIFEST_NAME = "embedding.json"
+LOCAL_STATE_NAME = "local_embedder.npz"
+
+
+# 캐시 키용 텍스트 정규화 (유니코드 정규화 + 공백 정리)
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+# ── 1. 임베딩 백엔드 인터페이스 (model_name 을 구현하지 않은 백엔드는 생성 시점에 TypeError)
+class EmbeddingProvider(Embeddings, abc.ABC):
+    backend: str = ""
+    remote: bool = False   # 네트워크 호출 여부 (True면 디스크 캐시 사용)
+
+    @property
+    @abc.abstractmethod
+    def model_name(self) -> str:
+        ...
+
+    # 인덱스 폴더에 기록할 정보
+    def describe(self) -> dict:
+        return {"backend": self.backend, "model": self.model_name}
+
+
+# 1-1. OpenAI 임베딩 (기존 방식)
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    backend = "openai"
+    remote = True
+
+    def __init__(self, model: str = settings.EMBEDDING_MODEL):
+        from langchain_openai import OpenAIEmbeddings
+        self._model = model
+        self._client = OpenAIEmbeddings(model=model, openai_api_key=settings.OPENAI_API_KEY)
+
+    @property
+    def model_name(self) -> str:
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(t) for t in texts)
+        return get_rate_limiter().call(lambda: self._client.embed_documents(texts), tokens=tokens)
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_rate_limiter().call(lambda: self._client.embed_query(text), tokens=estimate_tokens(text))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(t) for t in texts)
+        return await get_rate_limiter().acall(lambda: self._client.aembed_documents(texts), tokens=tokens)
+
+
+# 1-2. 로컬 CPU 임베딩: 문자 n-gram 해싱 + 코퍼스 IDF 가중치
+#      네트워크/키 없이 동작, 질의 1건 임베딩이 1ms 미만
+class HashingEmbeddingProvider(EmbeddingProvider):
+    backend = "local"
+    NGRAMS = (1, 2, 3)
+
+    def __init__(self, dim: int = 512, idf: np.ndarray | None = None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    @property
+    def model_name(self) -> str:
+        return f"hash-ngram-{self.dim}"
+
+    def describe(self) -> dict:
+        return {**super().describe(), "dim": self.dim}
+
+    # 소문자화 + 한글/영문/숫자만 남긴 뒤 단어 경계 포함 n-gram 생성
+    def _buckets(self, text: str) -> np.ndarray:
+        words = re.findall(r"[가-힣a-z0-9]+", normalize_text(text).lower())
+        grams = []
+        for w in words:
+            w = f" {w} "
+            for n in self.NGRAMS:
+                grams.extend(w[i:i + n] for i in range(len(w) - n + 1))
+        # 프로세스마다 달라지는 hash() 대신 crc32 사용 (빌드/검색 간 일관성)
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+
+    def _vector(self, text: str) -> np.ndarray:
+        h = self._buckets(text)
+        counts = np.bincount(h % self.dim, minlength=self.dim).astype(np.float32)
+        vec = np.log1p(counts) * self.idf      # sublinear tf × idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    # 코퍼스(제품 텍스트)로 버킷별 IDF 학습
+    def fit(self, corpus: List[str]) -> "HashingEmbeddingProvider":
+        df = np.zeros(self.dim, dtype=np.float64)
+        for text in corpus:
+            df[np.unique(self._buckets(text) % self.dim)] += 1
+        self.idf = (np.log((1 + len(corpus)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def save(self, index_dir: str | Path) -> None:
+        np.savez(Path(index_dir) / LOCAL_STATE_NAME, idf=self.idf, dim=self.dim)
+
+    @classmethod
+    def load(cls, index_dir: str | Path) -> "HashingEmbeddingProvider":
+        path = Path(index_dir) / LOCAL_STATE_NAME
+        if not path.exists():
+            return cls(settings.LOCAL_EMBED_DIM)
+        state = np.load(path)
+        return cls(int(state["dim"]), state["idf"].astype(np.float32))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t).tolist() for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text).tolist()
+
+    # CPU 로 1ms 미만이라 스레드 풀을 거치지 않고 바로 계산
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+# ── 2. 인덱스 폴더 manifest (어떤 백엔드로 만든 인덱스인지 기록)
+def write_manifest(index_dir: str | Path, provider: EmbeddingProvider, **extra) -> None:
+    info = {**provider.describe(), **extra}
+    with open(Path(index_dir) / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def read_manifest(index_dir: str | Path) -> dict:
+    path = Path(index_dir) / MANIFEST_NAME
+    if not path.exists():
+        # manifest 없는 기존 인덱스는 OpenAI 기본 모델로 만든 것으로 간주
+        return {"backend": "openai", "model": settings.EMBEDDING_MODEL}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_manifest(index_dir: str | Path, embeddings: "CachedEmbeddings") -> dict:
+    info = read_manifest(index_dir)
+    if info.get("backend") != embeddings.base.backend or info.get("model") != embeddings.model_name:
+        raise RuntimeError(
+            f"임베딩 백엔드 불일치: 인덱스({index_dir})는 {info.get('backend')}/{info.get('model')}로 생성됨, "
+            f"현재 설정은 {embeddings.base.backend}/{embeddings.model_name} "
+            f"→ EMBEDDING_BACKEND 설정을 맞추거나 app.rag.build_index 로 인덱스를 다시 만드세요."
+        )
+    return info
+
+
+# ── 3. 캐시 래퍼
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base: EmbeddingProvider, memory: LRUCache, disk: DiskCache | None = None):
+        self.base = base
+        self.model_name = base.model_name
+        self.memory = memory
+        self.disk = disk
+
+    # (모델명, 정규화 텍스트) 기준 content-address 키
+    def _key(self, text: str) -> str:
+        raw = f"{self.base.backend}:{self.model_name}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    # 1) 메모리 LRU → 2) 디스크 캐시 순으로 조회
+    def _lookup(self, keys: List[str]) -> dict[str, np.ndarray]:
+        vectors: dict[str, np.ndarray] = {}
+        for k in keys:
+            v = self.memory.get(k)
+            if v is not None:
+                vectors[k] = v
+
+        pending = [k for k in dict.fromkeys(keys) if k not in vectors]
+        if pending and self.disk is not None:
+            for k, blob in self.disk.get_many(pending).items():
+                v = np.frombuffer(blob, dtype=np.float32)
+                vectors[k] = v
+                self.memory.put(k, v)
+        return vectors
+
+    def _store(self, keys: List[str], new_vecs: List[List[float]], vectors: dict[str, np.ndarray]) -> None:
+        to_disk = {}
+        for k, vec in zip(keys, new_vecs):
+            v = np.asarray(vec, dtype=np.float32)
+            vectors[k] = v
+            self.memory.put(k, v)
+            to_disk[k] = v.tobytes()
+        if self.disk is not None:
+            self.disk.put_many(to_disk)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        vectors = self._lookup(keys)
+
+        # 3) 둘 다 없는 텍스트만 한 번에 임베딩 요청
+        missing = {k: t for k, t in zip(keys, texts) if k not in vectors}
+        if missing:
+            self._store(list(missing), self.base.embed_documents(list(missing.values())), vectors)
+        return [vectors[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    # 비동기 버전: 캐시 조회(SQLite)는 스레드에서, 미스만 비동기 임베딩 요청
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        vectors = await asyncio.to_thread(self._lookup, keys)
+        missing = {k: t for k, t in zip(keys, texts) if k not in vectors}
+        if missing:
+            new_vecs = await self.base.aembed_documents(list(missing.values()))
+            await asyncio.to_thread(self._store, list(missing), new_vecs, vectors)
+        return [vectors[k].tolist() for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.base.backend,
+            "model": self.model_name,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+# ── 4. 백엔드 생성
+def build_provider(backend: str, index_dir: str | Path | None = None) -> EmbeddingProvider:
+    if backend == "openai":
+        return OpenAIEmbeddingProvider()
+    if backend == "local":
+        if index_dir is None:
+            return HashingEmbeddingProvider(settings.LOCAL_EMBED_DIM)
+        return HashingEmbeddingProvider.load(index_dir)
+    raise ValueError(f"지원하지 않는 EMBEDDING_BACKEND: {backend}")
+
+
+@lru_cache(maxsize=None)
+def _cached_embeddings(backend: str, state_dir: str) -> CachedEmbeddings:
+    base = build_provider(backend, state_dir or None)
+    disk = None
+    if base.remote and settings.EMBED_CACHE_MAX_MB > 0:
+        disk = DiskCache(settings.EMBED_CACHE_PATH, max_bytes=settings.EMBED_CACHE_MAX_MB * 1024 * 1024)
+    return CachedEmbeddings(base, LRUCache(settings.EMBED_CACHE_SIZE), disk)
+
+
+# 프로세스 전체에서 백엔드(+인덱스)당 하나의 임베딩 클라이언트/캐시만 사용
+# 로컬 백엔드는 인덱스 폴더에 저장된 IDF 가중치를 쓰므로 인덱스별로 구분
+def get_embeddings(index_dir: str | Path | None = None) -> CachedEmbeddings:
+    backend = settings.EMBEDDING_BACKEND
+    state_dir = str(index_dir or settings.SUPPLEMENT_INDEX_DIR) if backend == "local" else ""
+    return _cached_embeddings(backend, state_dir)
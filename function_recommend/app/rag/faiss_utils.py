@@ -0,0 +1,357 @@
+## FAISS 인덱스 생성/검색 파라미터 공용 함수
+## flat(정확 검색) 외에 IVF-Flat / IVF-PQ / HNSW 근사 인덱스, SQ8 / PQ 압축 인덱스 지원
+## 압축 인덱스는 원본 벡터(vectors.npy, mmap)로 상위 후보를 정확 재정렬(refine)
+
+# 라이브러리 모음
+import hashlib
+import logging
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "pq")
+# 역색인(inverted list) 구조 → IO_FLAG_MMAP_IFC 로는 열 수 없음
+IVF_TYPES = ("ivf_flat", "ivf_pq")
+# 벡터를 손실 압축하는 타입 → 원본 벡터를 따로 저장해 refine
+COMPRESSED_TYPES = ("ivf_pq", "sq8", "pq")
+REFINE_VECTORS_NAME = "vectors.npy"
+# 인덱스 빌드 시 새로 쓰이는 파일 (버전 판별용, 검색 서버가 실제로 읽는 제품 DB 포함)
+VERSIONED_FILES = ("index.faiss", "index.pkl", "embedding.json", "products.sqlite", REFINE_VECTORS_NAME)
+
+
+# 1. 인덱스 생성 (학습 필요한 타입은 train_and_add 에서 학습)
+def make_index(
+    dim: int,
+    index_type: str = "flat",
+    nlist: int = 256,
+    pq_m: int = 16,
+    pq_bits: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+) -> faiss.Index:
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        return faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist, faiss.METRIC_L2)
+    if index_type == "ivf_pq":
+        if dim % pq_m:
+            raise ValueError(f"PQ 서브벡터 수(pq_m={pq_m})가 차원({dim})의 약수여야 합니다.")
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_m, pq_bits)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    if index_type == "sq8":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    if index_type == "pq":
+        if dim % pq_m:
+            raise ValueError(f"PQ 서브벡터 수(pq_m={pq_m})가 차원({dim})의 약수여야 합니다.")
+        return faiss.IndexPQ(dim, pq_m, pq_bits, faiss.METRIC_L2)
+    raise ValueError(f"지원하지 않는 인덱스 타입: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+
+# 학습 데이터가 부족하면 클러스터 수를 줄임 (FAISS 권장: 클러스터당 최소 39개)
+def clamp_nlist(nlist: int, n_vectors: int) -> int:
+    limit = max(1, n_vectors // 39)
+    if nlist > limit:
+        print(f"⚠️ nlist={nlist} → {limit} (벡터 {n_vectors}개로는 학습 데이터 부족)")
+        return limit
+    return nlist
+
+
+def train_and_add(index: faiss.Index, vectors: np.ndarray) -> faiss.Index:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+# IVF 는 direct map 이 있어야 행 번호 → 벡터 복원(reconstruct) 가능 (MMR / 유사도 정렬에서 사용)
+# 빌드 시 만들어 저장하고, direct map 없이 만든 기존 인덱스는 로드할 때 만듦 (역색인을 한 번 훑음)
+def ensure_direct_map(index: faiss.Index) -> faiss.Index:
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return index        # IVF 계열이 아니면 그대로
+    if ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index
+
+
+# 인덱스 파일을 mmap 으로 열기 (여러 워커가 같은 페이지 캐시 공유, 로딩 즉시 완료)
+# - IVF: 역색인만 mmap (IO_FLAG_MMAP)
+# - flat / HNSW / SQ8 / PQ: 코드 배열까지 mmap (IO_FLAG_MMAP_IFC, faiss 1.15 이상)
+# index_type 을 모르면(manifest 없음) IFC → 일반 mmap 순으로 시도, 둘 다 실패하면 전체를 메모리로 로드
+def read_index_mmap(path: str | Path, index_type: str | None = None) -> faiss.Index:
+    mmap_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    ifc_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    attempts = [mmap_flags | ifc_flag] if ifc_flag and index_type not in IVF_TYPES else []
+    attempts.append(mmap_flags)
+    error = None
+    for flags in attempts:
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError as e:
+            error = e
+    logger.warning("mmap 로드 실패 → 전체 메모리 로드 (%s, type=%s): %s", path, index_type, error)
+    return faiss.read_index(str(path))
+
+
+# 인덱스 폴더 버전: 빌드 산출물의 크기/수정 시각 해시 (다시 빌드하면 바뀜 → 답변 캐시 무효화 등에 사용)
+# extra_files: 인덱스 폴더 밖에 있는 산출물 (PRODUCT_DB_PATH 로 따로 둔 제품 DB 등)
+def index_version(index_dir: str | Path, *extra_files: str | Path) -> str:
+    h = hashlib.sha256()
+    paths = [Path(index_dir) / name for name in VERSIONED_FILES]
+    paths += [Path(p) for p in extra_files if Path(p) not in paths]
+    for path in paths:
+        if path.exists():
+            st = path.stat()
+            h.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+
+# 2. 검색 시점 파라미터 (nprobe: IVF 탐색 클러스터 수, efSearch: HNSW 탐색 폭)
+def apply_search_params(index: faiss.Index, nprobe: int | None = None, ef_search: int | None = None) -> dict:
+    applied = {}
+    if nprobe is not None:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+        except RuntimeError:
+            ivf = None      # IVF 계열이 아니면 무시
+        if ivf is not None:
+            ivf.nprobe = int(nprobe)
+            applied["nprobe"] = ivf.nprobe
+    if ef_search is not None:
+        hnsw_index = faiss.downcast_index(index)
+        if hasattr(hnsw_index, "hnsw"):
+            hnsw_index.hnsw.efSearch = int(ef_search)
+            applied["efSearch"] = hnsw_index.hnsw.efSearch
+    return applied
+
+
+def describe_index(index: faiss.Index) -> str:
+    return type(faiss.downcast_index(index)).__name__
+
+
+# 3. 압축 인덱스 + 원본 벡터 refine
+def save_refine_vectors(index_dir: str | Path, vectors: np.ndarray) -> None:
+    np.save(Path(index_dir) / REFINE_VECTORS_NAME, np.ascontiguousarray(vectors, dtype=np.float32))
+
+
+# 원본 벡터는 mmap 으로 열어 필요한 행만 페이지 단위로 읽음 (워커 간 페이지 캐시 공유)
+def load_refine_vectors(index_dir: str | Path) -> np.ndarray | None:
+    path = Path(index_dir) / REFINE_VECTORS_NAME
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def search_refined(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    vectors: np.ndarray | None = None,
+    factor: int = 4,
+    params: faiss.SearchParameters | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    q = np.ascontiguousarray(queries, dtype=np.float32)
+    kwargs = {"params": params} if params is not None else {}
+    if vectors is None or factor <= 1:
+        return index.search(q, k, **kwargs)
+
+    # 1) 압축 인덱스에서 k × factor 후보 검색
+    _, cand = index.search(q, k * factor, **kwargs)
+    valid = cand >= 0
+
+    # 2) 후보 원본 벡터로 정확한 L2 거리 재계산 (n, k', dim) 한 번에
+    rows = vectors[np.where(valid, cand, 0)]
+    exact = ((rows - q[:, None, :]) ** 2).sum(axis=-1, dtype=np.float32)
+    exact[~valid] = np.inf
+
+    # 3) 상위 k 재정렬
+    order = np.argsort(exact, axis=1)[:, :k]
+    dists = np.take_along_axis(exact, order, axis=1)
+    ids = np.take_along_axis(cand, order, axis=1)
+    ids[~np.isfinite(dists)] = -1
+    return dists, ids
+
+
+# 4. ID 필터 검색 (허용/제외 행 번호 → 비트맵 → FAISS IDSelectorBitmap 으로 검색 중에 적용)
+# allow / deny: 행 번호 목록 또는 길이 n 의 bool 마스크, 둘 다 None 이면 필터 없음
+def build_id_mask(n: int, allow=None, deny=None) -> np.ndarray | None:
+    if allow is None and deny is None:
+        return None
+    mask = np.ones(n, dtype=bool) if allow is None else _as_mask(allow, n).copy()
+    if deny is not None:
+        mask &= ~_as_mask(deny, n)
+    return mask
+
+
+def _as_mask(ids, n: int) -> np.ndarray:
+    if isinstance(ids, np.ndarray) and ids.dtype == bool:
+        return ids
+    mask = np.zeros(n, dtype=bool)
+    mask[np.fromiter(ids, dtype=np.int64)] = True
+    return mask
+
+
+# 인덱스 종류에 맞는 SearchParameters (현재 nprobe / efSearch 유지) + selector 가 참조하는 비트맵
+def selector_params(index: faiss.Index, mask: np.ndarray, nprobe: int | None = None):
+    bitmap = np.packbits(mask, bitorder="little")     # FAISS 비트맵: i번째 비트 = bitmap[i >> 3] >> (i & 7)
+    sel = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=nprobe or ivf.nprobe)
+    elif hasattr(faiss.downcast_index(index), "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=faiss.downcast_index(index).hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    # bitmap 이 먼저 해제되지 않도록 함께 반환 (selector 는 포인터만 보관)
+    return params, bitmap
+
+
+# 허용 행만 대상으로 정확한 L2 검색 (원본 벡터 또는 인덱스 복원 벡터를 블록 단위로)
+def exact_search_subset(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    rows: np.ndarray,
+    vectors: np.ndarray | None = None,
+    block: int = 16384,
+) -> tuple[np.ndarray, np.ndarray]:
+    q = np.ascontiguousarray(queries, dtype=np.float32)
+    best_d = np.full((len(q), k), np.inf, dtype=np.float32)
+    best_i = np.full((len(q), k), -1, dtype=np.int64)
+    q_norm = (q ** 2).sum(axis=1, keepdims=True)
+    for start in range(0, len(rows), block):
+        r = rows[start:start + block]
+        v = np.asarray(vectors[r] if vectors is not None else index.reconstruct_batch(r), dtype=np.float32)
+        d = np.maximum(q_norm - 2 * q @ v.T + (v ** 2).sum(axis=1)[None, :], 0)
+        # 이전 블록까지의 top-k 와 합쳐 다시 top-k
+        cat_d = np.hstack([best_d, d])
+        cat_i = np.hstack([best_i, np.broadcast_to(r, d.shape)])
+        order = np.argsort(cat_d, axis=1, kind="stable")[:, :k]
+        best_d = np.take_along_axis(cat_d, order, axis=1)
+        best_i = np.take_along_axis(cat_i, order, axis=1)
+    best_i[~np.isfinite(best_d)] = -1
+    return best_d, best_i
+
+
+# ID selector 를 지원하지 않는 인덱스 타입 (IndexPQ 등) → selector 검색을 건너뛰고 바로 정확 검색
+# 목록에 없는 타입이 처음 실패하면 추가해서 이후 요청부터는 시도하지 않음
+_NO_SELECTOR_TYPES = {"IndexPQ"}
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    return describe_index(index) not in _NO_SELECTOR_TYPES
+
+
+# 필터를 만족하는 결과를 항상 min(k, 허용 개수)개 반환
+# 1) selector 를 넣어 FAISS 검색 → 2) 근사 인덱스(IVF/HNSW)가 k개를 못 채운 질의만 허용 행 정확 검색으로 보완
+def search_filtered(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    mask: np.ndarray,
+    vectors: np.ndarray | None = None,
+    factor: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    q = np.ascontiguousarray(queries, dtype=np.float32)
+    allowed = np.flatnonzero(mask)
+    k = min(k, len(allowed))
+    if k == 0:
+        return np.empty((len(q), 0), dtype=np.float32), np.empty((len(q), 0), dtype=np.int64)
+
+    dists = np.full((len(q), k), np.inf, dtype=np.float32)
+    ids = np.full((len(q), k), -1, dtype=np.int64)
+    short = np.arange(len(q))
+    if supports_selector(index):
+        params, _bitmap = selector_params(index, mask)
+        try:
+            dists, ids = search_refined(index, q, k, vectors, factor, params)
+            short = np.flatnonzero((ids < 0).any(axis=1))
+        except RuntimeError as e:      # selector 미지원 인덱스 타입 → 기록해 두고 정확 검색
+            _NO_SELECTOR_TYPES.add(describe_index(index))
+            logger.warning("%s 는 ID selector 미지원 → 정확 검색으로 전환: %s", describe_index(index), e)
+    if len(short) == 0:
+        return dists, ids
+
+    try:
+        d2, i2 = exact_search_subset(index, q[short], k, allowed, vectors)
+    except RuntimeError:
+        # 벡터 복원 불가(direct map 없는 IVF) → 모든 클러스터 탐색으로 재검색
+        ivf = faiss.extract_index_ivf(index)
+        params, _bitmap = selector_params(index, mask, nprobe=ivf.nlist)
+        d2, i2 = search_refined(index, q[short], k, vectors, factor, params)
+    dists, ids = dists.copy(), ids.copy()
+    dists[short], ids[short] = d2, i2
+    return dists, ids
+
+
+# 5. MMR(maximal marginal relevance) 다양화: 후보 풀 안에서 관련도와 중복도를 함께 고려해 k개 선택
+# 후보 간 코사인 유사도 행렬은 한 번만 계산, 선택 루프는 k번 (매 단계 벡터 연산)
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_: float = 0.7) -> np.ndarray:
+    c = np.asarray(candidates, dtype=np.float32)
+    n = len(c)
+    if n <= k:
+        return np.arange(n)
+    c = c / np.maximum(np.linalg.norm(c, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query, dtype=np.float32).ravel()
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+    relevance = c @ q           # (n,)
+    sim = c @ c.T               # (n, n)
+    selected = [int(np.argmax(relevance))]
+    max_sim = sim[selected[0]].copy()          # 후보별 "이미 고른 것들과의 최대 유사도"
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    for _ in range(k - 1):
+        score = lambda_ * relevance - (1 - lambda_) * max_sim
+        score[~available] = -np.inf
+        nxt = int(np.argmax(score))
+        selected.append(nxt)
+        available[nxt] = False
+        np.maximum(max_sim, sim[nxt], out=max_sim)
+    return np.asarray(selected)
+
+
+# 6. 빌드 리포트: 메모리 절감량 / flat 기준 recall@k
+def index_bytes(index: faiss.Index) -> int:
+    return int(faiss.serialize_index(index).size)
+
+
+def recall_at_k(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    k: int = 10,
+    n_queries: int = 500,
+    refine_factor: int = 0,
+    seed: int = 0,
+) -> float:
+    k = min(k, len(vectors))      # 벡터 수보다 큰 k 는 -1 패딩이 생김
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = np.ascontiguousarray(vectors[sample], dtype=np.float32)
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    _, truth = flat.search(queries, k)
+
+    if refine_factor > 1:
+        _, found = search_refined(index, queries, k, vectors, refine_factor)
+    else:
+        _, found = index.search(queries, k)
+    # -1(빈 자리)은 적중으로 세지 않음
+    hits, total = 0, 0
+    for t, f in zip(truth.tolist(), found.tolist()):
+        t = set(t) - {-1}
+        hits += len(t & (set(f) - {-1}))
+        total += len(t)
+    return hits / total if total else 1.0
@@ -2,17 +2,18 @@
 ## 이후 수정 필요
 
 # 라이브러리 모음
-from typing import List
+from typing import AsyncIterator, List
 from openai import OpenAI
 from langchain_openai import ChatOpenAI
 from langchain.schema import Document
-import time
 import os
+from app.rag.rate_limiter import get_rate_limiter, estimate_tokens
 
 
 # 프롬프트 작성
-_llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.2, openai_api_key=os.getenv("OPENAI_API_KEY"))
-RATE_LIMIT_DELAY = 2.0 
+LLM_MODEL = "gpt-4o-mini"
+_llm = ChatOpenAI(model_name=LLM_MODEL, temperature=0.2, openai_api_key=os.getenv("OPENAI_API_KEY"))
+ANSWER_TOKENS = 1500   # 응답 토큰 예산 (rate limiter TPM 차감용 추정치)
 #--- 0529 수정부분---------------------#
 PROMPT = """당신은 관절, 뼈, 근육, 뇌, 소화계 등의 증상에 따라 적절한 건강기능식품을 추천하는 영양제 전문가입니다.
 아래 **컨텍스트**는 두 부분으로 이루어집니다.
@@ -75,7 +76,7 @@ PROMPT = """당신은 관절, 뼈, 근육, 뇌, 소화계 등의 증상에 따
 #     time.sleep(RATE_LIMIT_DELAY)
 #     return _llm.invoke(prompt).content.strip()
 #----------프롬프트 수정 (가희님 테스트 부탁드려요) -------------------------#
-def generate_answer(context_docs: List[Document], question: str) -> str:
+def build_prompt(context_docs: List[Document], question: str) -> str:
     # 1) 먼저 문서들에서 제품명 메타데이터만 추출해 텍스트로 구성
     product_names = [
         doc.metadata["name"] for doc in context_docs
@@ -95,9 +96,29 @@ def generate_answer(context_docs: List[Document], question: str) -> str:
     context_str = products_heading + "\n".join([d.page_content for d in context_docs])
 
     # 4) 최종 프롬프트
-    prompt = PROMPT.format(context=context_str, question=question)
+    return PROMPT.format(context=context_str, question=question)
+
+
+def generate_answer(context_docs: List[Document], question: str) -> str:
+    prompt = build_prompt(context_docs, question)
+
+    # LLM 호출 (공용 rate limiter: 한도 내에서는 대기 없음, 429 시에만 백오프)
+    resp = get_rate_limiter().call(lambda: _llm.invoke(prompt), tokens=estimate_tokens(prompt) + ANSWER_TOKENS)
+    return resp.content.strip()
+
+
+# 비동기 버전 (이벤트 루프를 막지 않고 LLM 응답 대기)
+async def agenerate_answer(context_docs: List[Document], question: str) -> str:
+    prompt = build_prompt(context_docs, question)
+    resp = await get_rate_limiter().acall(lambda: _llm.ainvoke(prompt), tokens=estimate_tokens(prompt) + ANSWER_TOKENS)
+    return resp.content.strip()
 
-    # LLM 호출
-    time.sleep(RATE_LIMIT_DELAY)
-    return _llm.invoke(prompt).content.strip()
 
+# 스트리밍 버전: 토큰이 생성되는 대로 조각 단위로 반환 (SSE 응답용)
+# 이미 일부 토큰을 보낸 뒤에는 재시도할 수 없으므로 429 재시도 없이 버킷 차감만 수행
+async def astream_answer(context_docs: List[Document], question: str) -> AsyncIterator[str]:
+    prompt = build_prompt(context_docs, question)
+    await get_rate_limiter().aacquire(estimate_tokens(prompt) + ANSWER_TOKENS)
+    async for chunk in _llm.astream(prompt):
+        if chunk.content:
+            yield chunk.content
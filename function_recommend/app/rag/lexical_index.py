@@ -0,0 +1,96 @@
+## 제품명 / 성분 / 기능 필드 BM25 어휘 색인 (프로세스 내 메모리)
+## 한국어 형태소 분석기 없이 단어 + 음절 bi-gram 토큰 사용 → 제품명 부분 일치("루테인" ⊂ "중외파워루테인")도 검색
+## 임베딩 호출이 없어 제품명 검색은 네트워크 없이 처리, 벡터 검색과는 RRF 로 결합
+
+# 라이브러리 및 설정 가져오기
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from app.sql_utils.product_store import get_product_store
+
+_WORD_RE = re.compile(r"[가-힣a-z0-9]+")
+# 필드별 가중치 (제품명 일치를 가장 중요하게)
+FIELD_WEIGHTS = {"name": 2.0, "ingredient": 1.0, "function": 1.0}
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for w in _WORD_RE.findall(text.lower()):
+        tokens.append(w)
+        if len(w) > 2:
+            tokens.extend(w[i:i + 2] for i in range(len(w) - 1))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, fields: dict[str, Sequence[str]], weights: dict[str, float] = FIELD_WEIGHTS,
+                 k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        n_docs = len(next(iter(fields.values()))) if fields else 0
+        postings: dict[str, tuple[list[int], list[float]]] = {}
+        lengths = np.zeros(n_docs, dtype=np.float32)
+        for row in range(n_docs):
+            # 필드 가중치를 곱한 term frequency (BM25F 단순화)
+            tf: Counter = Counter()
+            for name, values in fields.items():
+                w = weights.get(name, 1.0)
+                for t in tokenize(values[row] or ""):
+                    tf[t] += w
+            lengths[row] = sum(tf.values())
+            for t, f in tf.items():
+                rows, freqs = postings.setdefault(t, ([], []))
+                rows.append(row)
+                freqs.append(f)
+
+        self.n_docs = n_docs
+        self._len_norm = 1 - b + b * lengths / (lengths.mean() if n_docs and lengths.mean() > 0 else 1.0)
+        # term → (행 번호 배열, tf 배열, idf)
+        self._postings = {
+            t: (np.asarray(rows, dtype=np.int64), np.asarray(freqs, dtype=np.float32),
+                float(np.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))))
+            for t, (rows, freqs) in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    # 질의 토큰별 posting 만 NumPy 로 누적 → (행 번호, 점수) 내림차순 top_k
+    # mask: 허용 행 bool 마스크 (벡터 검색과 같은 필터)
+    def search(self, query: str, top_k: int = 5, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for t, qtf in Counter(tokenize(query)).items():
+            posting = self._postings.get(t)
+            if posting is None:
+                continue
+            rows, tf, idf = posting
+            scores[rows] += qtf * idf * tf * (self.k1 + 1) / (tf + self.k1 * self._len_norm[rows])
+        if mask is not None:
+            scores[~mask] = 0
+
+        hit = np.flatnonzero(scores > 0)
+        if len(hit) > top_k:
+            hit = hit[np.argpartition(-scores[hit], top_k - 1)[:top_k]]
+        order = hit[np.argsort(-scores[hit], kind="stable")]
+        return order, scores[order]
+
+
+# Reciprocal Rank Fusion: 여러 순위 목록의 1/(k + 순위) 합으로 결합 (점수 스케일이 달라도 됨)
+def rrf_fuse(rankings: Iterable[Sequence[int]], top_k: int, k: int = 60) -> list[tuple[int, float]]:
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda x: -x[1])[:top_k]
+
+
+# 프로세스당 한 번, 제품 저장소의 짧은 컬럼만으로 생성
+@lru_cache(maxsize=1)
+def get_lexical_index() -> BM25Index:
+    store = get_product_store()
+    index = BM25Index({f: store.column(f) for f in FIELD_WEIGHTS})
+    print(f"[BM25] {len(index)} docs, {len(index._postings)} terms")
+    return index
@@ -1,24 +1,141 @@
 # 수빈님 코드 중 필요한 부분만 가져왔습니다.
+# 프로세스당 한 번만 인덱스를 로드하는 서비스로 변경 (get_msd_service)
+# 알려진 성분은 오프라인으로 만든 스니펫 테이블(msd_snippets.json)에서 바로 조회
+#
+# 스니펫 테이블 생성 (function_recommend 폴더에서 실행)
+#   python -m app.rag.msd_rag --build-snippets
 
+import argparse
+import asyncio
+import json
+import pickle
+import threading
 from pathlib import Path
-from typing import List
-from langchain_openai import OpenAIEmbeddings
+from typing import List, Optional
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from app.config.settings import settings
+from app.rag.embeddings import get_embeddings, check_manifest
+from app.rag.faiss_utils import apply_search_params, load_refine_vectors, search_refined, read_index_mmap
+
+SNIPPETS_NAME = "msd_snippets.json"
+NO_INFO = "추가 정보 없음"
+
 
 class MsdRagSearch:
-    def __init__(self, openai_api_key: str, index_dir: str = R"C:\faiss_index_msd"):
-        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        self.db = FAISS.load_local(
-            folder_path=index_dir,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True
+    # 임베딩 백엔드는 settings.EMBEDDING_BACKEND 로 선택 (openai_api_key 인자는 기존 호출 호환용)
+    def __init__(self, openai_api_key: Optional[str] = None, index_dir: str = settings.MSD_INDEX_DIR):
+        self.embeddings = get_embeddings(index_dir)
+        manifest = check_manifest(index_dir, self.embeddings)
+        # FAISS.load_local 과 같은 구성, 인덱스 파일만 mmap 으로 열어 워커 간 공유
+        with open(Path(index_dir) / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        self.db = FAISS(
+            self.embeddings,
+            read_index_mmap(Path(index_dir) / "index.faiss", manifest.get("index_type")),
+            docstore,
+            index_to_docstore_id,
         )
+        apply_search_params(self.db.index, settings.FAISS_NPROBE, settings.FAISS_EF_SEARCH)
+        # 압축 인덱스(SQ8/PQ)로 만든 경우 원본 벡터로 재정렬
+        self.vectors = load_refine_vectors(index_dir)
+
+        # 성분 → 주의사항 스니펫 사전 테이블 (없으면 빈 테이블)
+        self.snippets_path = Path(index_dir) / SNIPPETS_NAME
+        self.snippet_table: dict[str, list[str]] = {}
+        if self.snippets_path.exists():
+            with open(self.snippets_path, encoding="utf-8") as f:
+                self.snippet_table = json.load(f)
+
+    # 여러 질의를 임베딩 1회 + FAISS 검색 1회로 처리
+    def _similarity_search_batch(self, queries: List[str], k: int):
+        return self._search_vectors(self.embeddings.embed_documents(queries), k)
+
+    def _search_vectors(self, vectors, k: int):
+        q = np.asarray(vectors, dtype=np.float32)
+        _, ids = search_refined(self.db.index, q, k, self.vectors, settings.FAISS_REFINE_FACTOR)
+        return [
+            [self.db.docstore.search(self.db.index_to_docstore_id[i]) for i in row.tolist() if i >= 0]
+            for row in ids
+        ]
+
+    @staticmethod
+    def _to_snippets(docs) -> List[str]:
+        return [d.page_content[:300].strip() + "…" for d in docs] if docs else [NO_INFO]
+
+    # 스니펫 테이블에서 바로 찾을 수 있는 성분과 검색이 필요한 성분 분리
+    def _from_table(self, ingredients: List[str], k: int) -> tuple[dict[str, List[str]], List[str]]:
+        result: dict[str, List[str]] = {}
+        misses = []
+        for ing in dict.fromkeys(ingredients):
+            cached = self.snippet_table.get(ing)
+            if cached and len(cached) >= k:
+                result[ing] = cached[:k]
+            else:
+                misses.append(ing)
+        return result, misses
+
+    def search_side_effects_batch(self, ingredients: List[str], k: int = 1) -> dict[str, List[str]]:
+        result, misses = self._from_table(ingredients, k)
+        if misses:
+            for ing, docs in zip(misses, self._similarity_search_batch(misses, k)):
+                result[ing] = self._to_snippets(docs)
+
+        # MSD_RAG 실행 확인용
+        print(f"[MSD] table={len(result) - len(misses)} search={len(misses)} → {result}")
+        return result
+
+    # 비동기 버전: 임베딩은 비동기 호출, FAISS 검색(CPU)만 스레드에서 실행
+    async def asearch_side_effects_batch(self, ingredients: List[str], k: int = 1) -> dict[str, List[str]]:
+        result, misses = self._from_table(ingredients, k)
+        if misses:
+            vectors = await self.embeddings.aembed_documents(misses)
+            found = await asyncio.to_thread(self._search_vectors, vectors, k)
+            for ing, docs in zip(misses, found):
+                result[ing] = self._to_snippets(docs)
+
+        print(f"[MSD] table={len(result) - len(misses)} search={len(misses)} → {result}")
+        return result
 
     def search_side_effects(self, ingredient: str, k: int = 1) -> List[str]:
-        docs = self.db.similarity_search(ingredient, k=k)
-        snippets = [d.page_content[:300].strip() + "…" for d in docs] if docs else ["추가 정보 없음"]
+        return self.search_side_effects_batch([ingredient], k)[ingredient]
+
+    # function_ingredient.json 의 모든 성분에 대해 스니펫 테이블 생성 (오프라인)
+    def build_snippet_table(self, ingredients: List[str], k: int = 1, batch_size: int = 256) -> dict[str, List[str]]:
+        ingredients = list(dict.fromkeys(ingredients))
+        table: dict[str, List[str]] = {}
+        for i in range(0, len(ingredients), batch_size):
+            chunk = ingredients[i:i + batch_size]
+            for ing, docs in zip(chunk, self._similarity_search_batch(chunk, k)):
+                table[ing] = self._to_snippets(docs)
+        with open(self.snippets_path, "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False, indent=2)
+        self.snippet_table = table
+        return table
+
+
+# 프로세스 전체에서 하나의 MSD 서비스만 사용 (인덱스/임베딩 클라이언트 재사용)
+# 첫 호출이 여러 스레드에서 동시에 와도(콜드 스타트 동시 요청) 인덱스/스니펫 테이블은 한 번만 로드
+_msd_service: Optional[MsdRagSearch] = None
+_msd_lock = threading.Lock()
+
+
+def get_msd_service() -> MsdRagSearch:
+    global _msd_service
+    if _msd_service is None:
+        with _msd_lock:
+            if _msd_service is None:
+                _msd_service = MsdRagSearch(index_dir=settings.MSD_INDEX_DIR)
+    return _msd_service
 
-    # MSD_RAG 실행 확인용
-        print(f"[MSD] {ingredient} → {snippets}")
 
-        return snippets
\ No newline at end of file
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MSD 스니펫 테이블 생성")
+    ap.add_argument("--build-snippets", action="store_true")
+    ap.add_argument("--k", type=int, default=1)
+    args = ap.parse_args()
+    if args.build_snippets:
+        from app.sql_utils.function_map import get_function_map
+        service = get_msd_service()
+        table = service.build_snippet_table(get_function_map().vocabulary(), k=args.k)
+        print(f"✅ {service.snippets_path} 생성 완료 ({len(table)}개 성분)")
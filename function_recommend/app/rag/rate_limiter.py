@@ -0,0 +1,178 @@
+## OpenAI 호출 공용 rate limiter (고정 time.sleep 대체)
+## 분당 요청 수(RPM) / 분당 토큰 수(TPM) 토큰 버킷, 한도 안에서는 대기 없이 바로 호출
+## 실제로 429 가 오면 Retry-After(없으면 지수 백오프)만큼 모든 워커가 함께 쉼
+## 백엔드: "memory"(프로세스 내) | "file"(로컬 파일 + OS 파일 락, 같은 호스트 워커끼리 공유)
+
+# 라이브러리 및 설정 가져오기
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+from app.config.settings import settings
+
+try:
+    import fcntl
+except ImportError:       # Windows
+    fcntl = None
+    import msvcrt
+
+T = TypeVar("T")
+
+
+# 대략적인 토큰 수 추정 (한글 기준 약 2자당 1토큰, 버킷 예산용이라 정확할 필요 없음)
+def estimate_tokens(text: str) -> int:
+    return len(text) // 2 + 1
+
+
+# ── 1. 버킷 상태 저장소
+class MemoryBackend:
+    blocking = False    # 짧은 스레드 락뿐 → 이벤트 루프에서 바로 호출해도 됨
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict = {}
+
+    @contextmanager
+    def locked(self) -> Iterator[dict]:
+        with self._lock:
+            yield self._state
+
+
+class FileBackend:
+    blocking = True     # flock + 파일 읽기/쓰기 → 비동기 경로에서는 스레드에서 실행
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._thread_lock = threading.Lock()   # 같은 프로세스 안 스레드끼리
+
+    @contextmanager
+    def locked(self) -> Iterator[dict]:
+        with self._thread_lock, open(self.path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state).encode("utf-8"))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ── 2. 토큰 버킷 rate limiter
+class RateLimiter:
+    def __init__(self, rpm: int, tpm: int, backend, max_retries: int = 5):
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.backend = backend
+        self.max_retries = max_retries
+
+    # 버킷에서 차감 시도 → 0 이면 성공, 아니면 기다려야 할 초
+    def _try_take(self, tokens: int) -> float:
+        want = {"requests": 1, "tokens": tokens}
+        with self.backend.locked() as state:
+            now = time.time()   # 프로세스 간 공유하므로 wall clock 사용
+            pause = state.get("pause_until", 0) - now
+            if pause > 0:
+                return pause
+
+            levels, wait = {}, 0.0
+            for name, limit in self.limits.items():
+                if limit <= 0:            # 0 이하는 제한 없음
+                    continue
+                rate = limit / 60.0
+                b = state.get(name, {"level": limit, "ts": now})
+                level = min(limit, b["level"] + (now - b["ts"]) * rate)
+                need = min(want[name], limit)   # 한도보다 큰 요청도 언젠가는 통과
+                levels[name] = level - need
+                if level < need:
+                    wait = max(wait, (need - level) / rate)
+            if wait > 0:
+                return wait
+            for name, level in levels.items():
+                state[name] = {"level": level, "ts": now}
+            return 0.0
+
+    def acquire(self, tokens: int = 1) -> None:
+        while (wait := self._try_take(tokens)) > 0:
+            time.sleep(wait)
+
+    # 파일 백엔드는 락 대기/파일 I/O 가 이벤트 루프를 막지 않도록 스레드에서 실행
+    async def _in_loop(self, fn: Callable[..., T], *args) -> T:
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def aacquire(self, tokens: int = 1) -> None:
+        while (wait := await self._in_loop(self._try_take, tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    # 429 응답 시 모든 워커가 함께 쉬도록 공유 상태에 기록
+    def penalize(self, seconds: float) -> None:
+        with self.backend.locked() as state:
+            state["pause_until"] = max(state.get("pause_until", 0), time.time() + seconds)
+
+    async def apenalize(self, seconds: float) -> None:
+        await self._in_loop(self.penalize, seconds)
+
+    def _backoff_seconds(self, err: Exception, attempt: int) -> float:
+        retry_after = None
+        response = getattr(err, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+    def call(self, fn: Callable[[], T], tokens: int = 1) -> T:
+        from openai import RateLimitError
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                return fn()
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self._backoff_seconds(e, attempt)
+                print(f"[RateLimit] 429 → {wait:.1f}s 대기 후 재시도 ({attempt + 1}/{self.max_retries})")
+                self.penalize(wait)
+
+    async def acall(self, fn: Callable, tokens: int = 1):
+        from openai import RateLimitError
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(tokens)
+            try:
+                return await fn()
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self._backoff_seconds(e, attempt)
+                print(f"[RateLimit] 429 → {wait:.1f}s 대기 후 재시도 ({attempt + 1}/{self.max_retries})")
+                await self.apenalize(wait)
+
+
+# 모든 OpenAI 호출 지점이 같은 limiter 공유
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "file":
+        backend = FileBackend(settings.RATE_LIMIT_STATE_PATH)
+    else:
+        backend = MemoryBackend()
+    return RateLimiter(settings.OPENAI_RPM, settings.OPENAI_TPM, backend, settings.RATE_LIMIT_MAX_RETRIES)
@@ -1,15 +1,98 @@
 ## 벡터 유사도 검색해서 답변 구성
+## 검색 모드: "vector"(FAISS) | "lexical"(BM25, 임베딩 호출 없음) | "hybrid"(두 결과를 RRF 로 결합)
+## allow / deny: 허용·제외할 제품 행 번호(또는 bool 마스크) → 검색 안에서 필터링 (예: 알러지 제품 제외)
+## mmr=True: k × MMR_POOL 후보에서 MMR 로 비슷한 제품(같은 제품군 다른 SKU 등) 중복을 줄여 k개 선택 (vector / hybrid)
 
 # 라이브러리 및 설정 가져오기
+import asyncio
+from typing import Literal, Optional
+
 from langchain.schema import Document
-from app.rag.vector_searcher import search_vector
+from app.config.settings import settings
+from app.rag.vector_searcher import diversify_rows, id_mask, search_rows, rows_to_results, IDX_DIR
+from app.rag.embeddings import get_embeddings
+from app.rag.lexical_index import get_lexical_index, rrf_fuse
+from app.rag.context_packer import warm_encoding
+
+SearchMode = Literal["vector", "lexical", "hybrid"]
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# BM25 색인은 FAISS 인덱스 로드(vector_searcher import)와 함께 시작 시 생성 → 첫 hybrid/lexical 요청이 빌드 비용을 내지 않음
+# (요청마다 search_mode 를 바꿀 수 있으므로 기본 모드와 관계없이 생성)
+get_lexical_index()
+# 컨텍스트 패킹용 tiktoken 인코딩도 시작 시 로드 (첫 요청에서 BPE 파일을 받지 않도록)
+warm_encoding()
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"지원하지 않는 search_mode: {mode} (가능: {', '.join(SEARCH_MODES)})")
+
+
+# 질의별 (행 번호, 점수) 목록
+# 점수 의미: vector = L2 거리(작을수록 비슷), lexical = BM25, hybrid = RRF (클수록 비슷)
+def _ranked_rows(queries: list[str], query_vecs: Optional[list], k: int, mode: str, mask=None, mmr: bool = False):
+    batch_rows, batch_scores = [], []
+    if mode == "lexical":
+        lex = get_lexical_index()
+        for q in queries:
+            rows, scores = lex.search(q, k, mask)
+            batch_rows.append(rows.tolist())
+            batch_scores.append(scores.astype(float).tolist())
+        return batch_rows, batch_scores
+
+    # hybrid 는 양쪽에서 k × HYBRID_POOL 개씩 후보를 뽑아 결합, MMR 은 k × MMR_POOL 후보 중에서 선택
+    pool = k * settings.HYBRID_POOL if mode == "hybrid" else k
+    keep = k * settings.MMR_POOL if mmr else k
+    distances, indices = search_rows(query_vecs, max(pool, keep), mask)
+    for q, q_vec, row_ids, row_dists in zip(queries, query_vecs, indices, distances.astype(float)):
+        valid = row_ids >= 0
+        if mode == "vector":
+            ranked = list(zip(row_ids[valid].tolist(), row_dists[valid].tolist()))
+        else:
+            lex_rows, _ = get_lexical_index().search(q, pool, mask)
+            ranked = rrf_fuse([row_ids[valid].tolist(), lex_rows.tolist()], keep, settings.HYBRID_RRF_K)
+        score_of = dict(ranked)
+        rows = [r for r, _ in ranked[:keep]]
+        rows = diversify_rows(q_vec, rows, k) if mmr else rows[:k]
+        batch_rows.append(rows)
+        batch_scores.append([score_of[r] for r in rows])
+    return batch_rows, batch_scores
+
+
+def _to_docs(batch_rows, batch_scores) -> list[list[Document]]:
+    return [
+        [Document(page_content=itm["text"], metadata=itm["metadata"]) for itm in results]
+        for results in rows_to_results(batch_rows, batch_scores)
+    ]
 
 
 # 설정
-def retrieve(query: str, k: int = 5) -> list[Document]:
-    from langchain_openai import OpenAIEmbeddings
-    embedding_model = OpenAIEmbeddings()
-    query_vec = embedding_model.embed_query(query)
-    results, _ = search_vector(query_vec, top_k=k)
-    return [Document(page_content=itm["text"], metadata=itm["metadata"]) for itm in results]
+def retrieve(
+    query: str, k: int = 5, mode: SearchMode = settings.SEARCH_MODE, allow=None, deny=None, mmr: bool = False
+) -> list[Document]:
+    _check_mode(mode)
+    # 임베딩 캐시(메모리 → 디스크)에 있으면 네트워크 호출 없이 바로 사용, lexical 모드는 임베딩 자체를 생략
+    query_vecs = None if mode == "lexical" else [get_embeddings(IDX_DIR).embed_query(query)]
+    return _to_docs(*_ranked_rows([query], query_vecs, k, mode, id_mask(allow, deny), mmr))[0]
+
+
+# 비동기 버전: 임베딩은 비동기 호출, FAISS/BM25 검색 + 메타 조회는 스레드에서 실행
+async def aretrieve(
+    query: str, k: int = 5, mode: SearchMode = settings.SEARCH_MODE, allow=None, deny=None, mmr: bool = False
+) -> list[Document]:
+    _check_mode(mode)
+    query_vecs = None if mode == "lexical" else [await get_embeddings(IDX_DIR).aembed_query(query)]
+    mask = id_mask(allow, deny)
+    return (await asyncio.to_thread(lambda: _to_docs(*_ranked_rows([query], query_vecs, k, mode, mask, mmr))))[0]
+
 
+# 여러 질의를 한 번에: 임베딩 1회(캐시 미스만) + FAISS 검색 1회
+def retrieve_many(
+    queries: list[str], k: int = 5, mode: SearchMode = settings.SEARCH_MODE, allow=None, deny=None, mmr: bool = False
+) -> list[list[Document]]:
+    if not queries:
+        return []
+    _check_mode(mode)
+    query_vecs = None if mode == "lexical" else get_embeddings(IDX_DIR).embed_documents(queries)
+    return _to_docs(*_ranked_rows(queries, query_vecs, k, mode, id_mask(allow, deny), mmr))
@@ -3,43 +3,109 @@
 
 #라이브러리 및 설정 가져오기
 # app/rag/vector_searcher.py
-import faiss, pickle, numpy as np
+import numpy as np
 from pathlib import Path
-from typing import Any
+from app.config.settings import settings
+from app.rag.embeddings import get_embeddings, check_manifest
+from app.rag.faiss_utils import (
+    apply_search_params, build_id_mask, describe_index, ensure_direct_map, index_version, load_refine_vectors,
+    mmr_select, search_filtered, search_refined, read_index_mmap,
+)
+from app.sql_utils.product_store import get_product_store
 
 # ── 경로 설정
-BASE = Path(__file__).resolve().parent.parent
-IDX_DIR = BASE / "data" / "faiss_index_supplement"
-
-
-# ── 인덱스 & 메타 한 번만 메모리에 로드
-_index = faiss.read_index(str(IDX_DIR / "index.faiss"))
-with open(IDX_DIR / "index.pkl", "rb") as f:
-    _metas: list[dict[str,Any]] = pickle.load(f)
-_vecs = None  
-
-# ── 검색 함수
-def search_vector(query_embedding: list[float], top_k: int = 5):
-    # 1) numpy 배열로 변환 & (1, dim) 모양으로 reshape
-    q = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
-
-    # 2) FAISS 인덱스에 검색 요청 (L2 거리 기준)
-    distances, indices = _index.search(q, top_k)
-
-    results, scores = [], []
-    # distances: shape (1, top_k), indices: (1, top_k)
-    for idx, dist in zip(indices[0], distances[0]):
-        # 메타데이터에서 같은 순서의 dict 가져오기
-        meta = _metas[idx]
-
-        results.append({
-            # • text: RAG에서 컨텍스트로 사용할 본문
-            "text": meta.get("text", ""),
-            # • metadata: Document.metadata 에 그대로 들어갈 dict
-            "metadata": meta,
-            # • score: FAISS가 계산한 거리값 (작을수록 비슷)
-            "score": float(dist),
-        })
-        scores.append(float(dist))
-
-    return results, scores
+IDX_DIR = Path(settings.SUPPLEMENT_INDEX_DIR)
+
+
+# 인덱스를 만든 임베딩 백엔드와 현재 설정이 같은지 확인 (차원 불일치 방지)
+_manifest = check_manifest(IDX_DIR, get_embeddings(IDX_DIR))
+
+# ── 인덱스 mmap 으로 로드 (워커 간 페이지 캐시 공유, 타입별 mmap 방식), 메타는 SQLite 제품 저장소에서 필요한 행만 조회
+# IVF 는 direct map 이 있어야 get_vectors(MMR / 유사도 정렬)가 동작 → 없이 만든 기존 인덱스면 여기서 생성
+_index = ensure_direct_map(read_index_mmap(IDX_DIR / "index.faiss", _manifest.get("index_type")))
+_store = get_product_store()
+# 압축 인덱스(SQ8/PQ)면 refine 용 원본 벡터 (mmap, 없으면 None)
+_vecs = load_refine_vectors(IDX_DIR)
+# 인덱스 재빌드 감지용 버전 (답변 캐시 키에 포함)
+INDEX_VERSION = index_version(IDX_DIR, _store.db_path)
+
+# 근사 인덱스(IVF/HNSW)면 검색 파라미터 적용
+_search_params = apply_search_params(_index, settings.FAISS_NPROBE, settings.FAISS_EF_SEARCH)
+print(f"[FAISS] {describe_index(_index)} ntotal={_index.ntotal} params={_search_params}")
+
+
+# 실행 중 검색 파라미터 변경 (정확도 ↔ 속도 조절)
+def set_search_params(nprobe: int | None = None, ef_search: int | None = None) -> dict:
+    _search_params.update(apply_search_params(_index, nprobe, ef_search))
+    return dict(_search_params)
+
+
+# 행 번호 → 원본 벡터 (refine 벡터가 있으면 mmap 에서, 없으면 인덱스에서 복원 / 복원 불가 인덱스면 None)
+def get_vectors(rows) -> np.ndarray | None:
+    rows = np.asarray(rows, dtype=np.int64)
+    if _vecs is not None:
+        return np.asarray(_vecs[rows], dtype=np.float32)
+    try:
+        return _index.reconstruct_batch(rows)
+    except RuntimeError:     # direct map 없는 IVF 등
+        return None
+
+
+# ── 후보 행 번호 → MMR 로 중복 줄인 k개 (선택 순서 = 새 순위), 벡터 복원 불가 인덱스면 앞에서 k개 그대로
+def diversify_rows(query_vec, rows: list[int], k: int, lambda_: float = settings.MMR_LAMBDA) -> list[int]:
+    if len(rows) <= k:
+        return rows
+    vectors = get_vectors(rows)
+    if vectors is None:
+        return rows[:k]
+    return [rows[i] for i in mmr_select(np.asarray(query_vec, dtype=np.float32), vectors, k, lambda_)]
+
+
+# ── 허용/제외 행 번호(또는 bool 마스크) → 검색용 비트마스크 (둘 다 None 이면 None)
+def id_mask(allow=None, deny=None) -> np.ndarray | None:
+    return build_id_mask(_index.ntotal, allow, deny)
+
+
+# ── FAISS 검색만 수행: (n, dim) 쿼리 블록 → (거리, 행 번호) 배열, 빈 자리는 -1
+# mask 가 있으면 FAISS ID selector 로 검색 중에 필터링, 조건을 만족하는 결과를 항상 min(k, 허용 개수)개 반환
+def search_rows(query_matrix, top_k: int = 5, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    # 1) float32 2차원 블록으로 변환 (FAISS는 C-연속 float32만 받음)
+    q = np.ascontiguousarray(np.asarray(query_matrix, dtype=np.float32))
+    if q.ndim == 1:
+        q = q.reshape(1, -1)
+
+    # 2) 한 번의 FAISS 호출 (L2 거리 기준, 압축 인덱스면 원본 벡터로 재정렬)
+    if mask is not None:
+        return search_filtered(_index, q, top_k, mask, _vecs, settings.FAISS_REFINE_FACTOR)
+    return search_refined(_index, q, top_k, _vecs, settings.FAISS_REFINE_FACTOR)
+
+
+# ── 행 번호 목록들 → 검색 결과 dict 목록 (메타는 중복 없이 한 번의 쿼리로 조회)
+def rows_to_results(batch_rows: list[list[int]], batch_scores: list[list[float]]) -> list[list[dict]]:
+    hit_ids = sorted({r for rows in batch_rows for r in rows})
+    meta_by_id = _store.get_rows(hit_ids)
+    return [
+        [{"text": meta_by_id[r].get("text", ""), "metadata": meta_by_id[r], "score": s} for r, s in zip(rows, scores)]
+        for rows, scores in zip(batch_rows, batch_scores)
+    ]
+
+
+# ── 배치 검색 함수: (n, dim) 쿼리 블록을 FAISS 한 번 호출로 검색
+def search_vectors(query_matrix, top_k: int = 5, allow=None, deny=None):
+    distances, indices = search_rows(query_matrix, top_k, id_mask(allow, deny))
+
+    # 3) 결과 구성: 유효한 hit(-1 제외)만
+    valid = indices >= 0
+    batch_rows = [row_ids[row_valid].tolist() for row_valid, row_ids in zip(valid, indices)]
+    batch_scores = [row_dists[row_valid].tolist() for row_valid, row_dists in zip(valid, distances.astype(float))]
+    return rows_to_results(batch_rows, batch_scores), batch_scores
+
+
+# ── 검색 함수 (단일 쿼리)
+def search_vector(query_embedding: list[float], top_k: int = 5, allow=None, deny=None):
+    # • text: RAG에서 컨텍스트로 사용할 본문
+    # • metadata: Document.metadata 에 그대로 들어갈 dict
+    # • score: FAISS가 계산한 거리값 (작을수록 비슷)
+    # • allow / deny: 허용·제외할 행 번호(또는 bool 마스크), 예) 알러지 성분 제품 제외
+    results, scores = search_vectors([query_embedding], top_k, allow, deny)
+    return results[0], scores[0]
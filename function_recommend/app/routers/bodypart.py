@@ -1,28 +1,38 @@
 ## 영양제 추천 로직
 
 # 라이브러리 모음
-import time
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Header, Response
 from pydantic import BaseModel
-import json, re
 from typing import List, Optional
 
 # 설정 가져오기
-from app.rag.retriever import retrieve
-from app.rag.generator import generate_answer
-from app.sql_utils.matcher import get_most_similar_function
-from app.sql_utils.sql_utils import load_body_function_options, fetch_functions_by_body
+from app.rag.retriever import aretrieve
+from app.rag.answer_cache import agenerate_answer, astream_answer
+from app.api.sse import stream_answer_response
+from app.rag.context_packer import cosine_scores, pack_documents, rank_candidates
+from app.rag.embeddings import get_embeddings
+from app.rag.vector_searcher import IDX_DIR, get_vectors
+from app.sql_utils.matcher import get_function_matcher
+from app.sql_utils.sql_utils import fetch_functions_by_body
+from app.sql_utils.catalog import get_catalog
 from app.routers.user_input import HealthSurvey
 from langchain.schema import Document
-from app.rag.msd_rag import MsdRagSearch
+from app.rag.msd_rag import get_msd_service
 from langchain.schema import Document
-from app.config.settings import settings
-from app.rag.vector_searcher import _metas  
+from app.sql_utils.product_store import get_product_store
+from app.sql_utils.ingredient_index import get_ingredient_index
+from app.sql_utils.function_map import get_function_map
+from app.sql_utils.product_filters import allergy_mask
 
 # 디버깅용 출력문
 print("bodypart 라우터 시작됨")
 router = APIRouter(prefix="/bodypart", tags=["Body-Part"])
 
+# 기능→성분 매핑과 성분 역색인은 라우터 로딩 시 한 번만 생성
+_fn_map = get_function_map()
+_ing_index = get_ingredient_index()
+
 
 # 기본 스키마 설정
 class BodyPartRequest(BaseModel):
@@ -38,117 +48,140 @@ class BodyPartRequest(BaseModel):
 #     caution:           str | None = None
 
 
-# 1. 기능 목록 조회
+# 1. 기능 목록 조회 (미리 직렬화한 응답 + ETag, 변경 없으면 304)
 @router.get("/options")
-def get_options():
-    rows = load_body_function_options()
-    opts: dict[str, list[str]] = {}
-    for r in rows:
-        funcs = [f.strip() for f in r["function"].split(",")]
-        opts.setdefault(r["body"], []).extend(funcs)
-    return {"options": opts}
+def get_options(if_none_match: Optional[str] = Header(None)):
+    catalog = get_catalog()
+    headers = {"ETag": catalog.options_etag, "Cache-Control": "public, max-age=300"}
+    if catalog.etag_matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.options_body, media_type="application/json", headers=headers)
 
 
-# 2. 유사 기능 매칭
+# 2. 유사 기능 매칭 (임베딩 코사인 top-1, 애매할 때만 LLM)
 @router.post("/bodyfunction/match")
 def match_function(data: BodyPartRequest):
     funcs = fetch_functions_by_body(data.body_part)
     if not funcs:
         raise HTTPException(404, "해당 부위에 기능이 없습니다.")
-    best = get_most_similar_function(data.function, funcs)
+    # 기능 이름 임베딩은 첫 매칭 요청 때 한 번만 계산 (import 시점에 네트워크 호출 없음)
+    best = get_function_matcher().match(data.body_part, data.function, funcs)
     if not best:
         raise HTTPException(404, "유사 기능을 찾지 못했습니다.")
     return {"matched_function": best}
 
-RATE_LIMIT_DELAY = 2.0 
-# 3. 기능별 추천
-@router.post("/recommend")
-def recommend(data: BodyPartRequest):
+# 3-2 ~ 3-3. 매핑 필터링 + 알러지 필터링 (SQLite 조회가 있어 스레드에서 실행)
+# 행 번호와 메타를 같은 순서로 반환 (이후 순위화에서 행 번호로 벡터/성분 커버리지 조회)
+def _filter_products(ingredients: List[str], survey: Optional[HealthSurvey]) -> tuple[list[int], list[dict]]:
+    # 기존 RAWMTRL_NM 등 대신, 미리 묶어둔 'ingredient' 필드의 역색인 사용 (성분 → 제품 행 번호)
+    rows = _ing_index.lookup(ingredients)
+    # 매칭된 행만 저장소에서 조회
+    found = get_product_store().get_rows(rows)
+    print("After mapping filter, matched:", len(rows))
+
+    # 사용자가 입력한 알러지 정보로 추가 필터링
+    # 메타데이터에 알러지 주의 문구가 들어있다면(예: IFTKN_ATNT_MATR_CN) 제외 → 알러지별 미리 계산한 비트맵 사용
+    deny = allergy_mask(survey.allergies) if survey else None
+    if deny is not None:
+        rows = [r for r in rows if not deny[r]]
+        print("After allergy filter, matched:", len(rows))
+    return rows, [found[r] for r in rows]
+
+
+# 성분 커버리지 + 기능 질의 벡터 유사도로 제품 순위화 (벡터 복원 불가 인덱스면 커버리지만 사용)
+def _rank_products(rows: list[int], matched: list[dict], ingredients: List[str], query_vec: List[float]) -> list[dict]:
+    if len(rows) < 2:
+        return matched
+    vectors = get_vectors(rows)
+    sims = cosine_scores(vectors, query_vec) if vectors is not None else None
+    order = rank_candidates(_ing_index.coverage(rows, ingredients), sims)
+    return [matched[i] for i in order]
+
+
+# MSD 부작용 정보 검색 (상주 서비스, 스니펫 테이블 우선 → 없는 성분만 한 번에 검색)
+async def _side_effects(ingredients: List[str]) -> dict[str, List[str]]:
+    # 최초 호출 시 인덱스 로딩이 있으므로 스레드에서 가져옴
+    service = await asyncio.to_thread(get_msd_service)
+    return await service.asearch_side_effects_batch(ingredients, k=1)
+
+
+# 3. 기능별 추천용 컨텍스트 구성 (제품 문서, MSD 주의사항 문서)
+async def _build_context(data: BodyPartRequest) -> tuple[List[Document], List[Document]]:
     print("Enter recommend():", data.dict())  # 디버깅용 출력문
-    with open("app/data/function_ingredient.json", encoding="utf-8") as f:
-        fn_ing_map = json.load(f)
-
-    # 3-1. 기능 기반 성분 매핑
-    raw_ing = next(
-        (itm["ingredient"] for itm in fn_ing_map if itm["function"] == data.function),
-        ""
-    )
-    print("Mapped ingredients:", raw_ing)  # 디버깅용 출력문
 
-    # 정규화 함수(이후 영양제 검색 성능 향상 위해 기능별로 매핑된 성분명 전처리)
-    norm = lambda t: re.sub(r"[^가-힣a-z0-9]+", "", t.lower())
+    # 3-1. 기능 기반 성분 매핑 (시작 시 컴파일된 매핑, 파일 변경 시 자동 갱신)
+    print("Mapped ingredients:", _fn_map.raw(data.function))  # 디버깅용 출력문
 
-    ingredients = [
-        norm(ing)
-        for part in raw_ing.split(",")
-        for ing in part.split("/")
-        if ing.strip()
-    ]
+    # 기능별로 매핑된 성분명은 로딩 시 이미 정규화됨
+    ingredients = list(_fn_map.get(data.function))
     print("Parsed ingredients list:", ingredients)  # 디버깅용 출력문
 
     if not ingredients:
         raise HTTPException(404, f"'{data.function}'에 매핑된 성분 정보가 없습니다.")
 
-    # 3-2. 매핑 필터링
-    matched = []
-    for m in _metas:
-        # 기존 RAWMTRL_NM 등 대신, 미리 묶어둔 'ingredient' 필드만 사용
-        ingr_field: str = m.get("ingredient", "").lower()
-        if any(ing in norm(ingr_field) for ing in ingredients):
-            matched.append(m)
-    print("After mapping filter, matched:", len(matched))
-
-    # 3-3. 사용자가 입력한 알러지 정보로 추가 필터링
-    if data.survey and data.survey.allergies:
-        user_allergies = {a.lower() for a in data.survey.allergies}
-        filtered = []
-        for m in matched:
-            # 메타데이터에 알러지 주의 문구가 들어있다면(예: IFTKN_ATNT_MATR_CN)
-            warn: str = m.get("caution", "").lower()
-            if not any(allg in warn for allg in user_allergies):
-                filtered.append(m)
-        matched = filtered
-        print("After allergy filter, matched:", len(matched))
+    # 3-2 ~ 3-3. 제품 필터링, 3-6. MSD 부작용 검색, 순위화용 질의 임베딩은 서로 독립적이므로 동시에 실행
+    (rows, matched), side_effects, query_vec = await asyncio.gather(
+        asyncio.to_thread(_filter_products, ingredients, data.survey),
+        _side_effects(ingredients[:2]),
+        get_embeddings(IDX_DIR).aembed_query(data.function),
+    )
 
     # 3-4. 매핑된 성분이나 추천 성분에 해당하는 영양제 없을 경우 RAG 활용하여 추천하는 로직 추가
     if not matched:
         print("매핑된 제품 없음 → RAG 수행")
-        docs = retrieve(data.function, k=3)
+        # 알러지 제품은 검색 단계에서 제외 (사후 필터링 없이 항상 k개)
+        deny = allergy_mask(data.survey.allergies) if data.survey else None
+        docs = await aretrieve(data.function, k=3, deny=deny)
     else:
+        # 관련도 높은 제품이 앞에 오도록 정렬 (프롬프트 예산이 넘치면 뒤쪽부터 빠짐)
+        ranked = await asyncio.to_thread(_rank_products, rows, matched, ingredients, query_vec)
         docs = [
             Document(page_content=m["text"], metadata=m)
-            for m in matched
+            for m in ranked
         ]
 
-    # 3-6. MSD 부작용 정보 검색
-    rag = MsdRagSearch(openai_api_key=settings.OPENAI_API_KEY)
     msd_docs = []
     for ing in ingredients[:2]:
-        time.sleep(RATE_LIMIT_DELAY)
-        snippet = rag.search_side_effects(ing, k=1)[0][:200] + "…"
+        snippet = side_effects[ing][0][:200] + "…"
         msd_docs.append(
             Document(page_content=f"[주의사항] {ing}: {snippet}", metadata={})
         )
+    return docs, msd_docs
 
-    # MSD 문서 추가된 전체 문서 context
-    all_docs = docs + msd_docs
-
-    # 3-7. generate_answer 가 기대하는 형식으로 변환 및 RAG 답변 생성
-    time.sleep(RATE_LIMIT_DELAY)
-    answer = generate_answer(all_docs, data.function)
-    context_list = [d.metadata.get("PRIMARY_FNCLTY", "") for d in docs]
 
+# 답변을 제외한 응답 필드 (일반 응답과 스트리밍 context 이벤트가 공유)
+def _context_payload(docs: List[Document], msd_docs: List[Document]) -> dict:
     return {
-    "recommendation": answer,
-    "context": context_list,
-    "msd_info": msd_docs,
-    "matched_supplements": [
-        {
-            "product_id":  d.metadata["id"],
-            "product_name": d.metadata.get("name"),
-            "primary_function": d.metadata.get("function"),
-            "caution": d.metadata.get("text"),
-        }
-        for d in docs
-    ],
-}
\ No newline at end of file
+        "context": [d.metadata.get("PRIMARY_FNCLTY", "") for d in docs],
+        "msd_info": msd_docs,
+        "matched_supplements": [
+            {
+                "product_id":  d.metadata["id"],
+                "product_name": d.metadata.get("name"),
+                "primary_function": d.metadata.get("function"),
+                "caution": d.metadata.get("text"),
+            }
+            for d in docs
+        ],
+    }
+
+
+# 3-7. 기능별 추천 (비동기: 제품 필터링과 MSD 조회를 동시에 수행, LLM 대기 중 이벤트 루프를 막지 않음)
+@router.post("/recommend")
+async def recommend(data: BodyPartRequest):
+    docs, msd_docs = await _build_context(data)
+    # 토큰 예산 안으로 줄인 제품 + MSD 문서 context 로 RAG 답변 생성 (같은 조합이면 답변 캐시 사용, rate limit 은 generator 내부에서 처리)
+    # 패킹은 문서별 토큰화(CPU)라 스레드에서 실행
+    packed = await asyncio.to_thread(pack_documents, docs, msd_docs)
+    answer, cached = await agenerate_answer(packed, data.function)
+    return {"recommendation": answer, "cached": cached, **_context_payload(docs, msd_docs)}
+
+
+# 3-8. 스트리밍 추천 (SSE): 매칭 제품/MSD 정보를 먼저 보내고 답변은 토큰 단위로 전송
+@router.post("/recommend/stream")
+async def recommend_stream(data: BodyPartRequest):
+    # 404 등은 스트림 시작 전에 일반 응답으로 반환
+    docs, msd_docs = await _build_context(data)
+    packed = await asyncio.to_thread(pack_documents, docs, msd_docs)
+    tokens, cached = await astream_answer(packed, data.function)
+    return stream_answer_response({"cached": cached, **_context_payload(docs, msd_docs)}, tokens)
@@ -0,0 +1,47 @@
+## 신체 부위 → 기능 카탈로그 (data/body_function.json)
+## 프로세스 시작 시 한 번 읽어 부위별 색인 + /bodypart/options 응답 본문/ETag 를 미리 만들어 둠
+
+# 라이브러리 및 설정 가져오기
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from app.config.settings import BASE_DIR
+
+BODY_FUNCTION_PATH = BASE_DIR / "data" / "body_function.json"
+
+
+class BodyFunctionCatalog:
+    def __init__(self, path: Path = BODY_FUNCTION_PATH):
+        with open(path, encoding="utf-8") as f:
+            self.rows: list[dict] = json.load(f)
+
+        # 부위 → 기능 목록 (같은 부위가 여러 행이면 첫 행 사용: 기존 fetch_functions_by_body 동작)
+        self.by_body: dict[str, tuple[str, ...]] = {}
+        # /options 응답용 (같은 부위 여러 행이면 이어붙임: 기존 get_options 동작)
+        options: dict[str, list[str]] = {}
+        for r in self.rows:
+            funcs = [f.strip() for f in r["function"].split(",")]
+            self.by_body.setdefault(r["body"], tuple(funcs))
+            options.setdefault(r["body"], []).extend(funcs)
+        self.options = options
+
+        # 응답 본문은 한 번만 직렬화, 내용 해시로 ETag 생성
+        self.options_body = json.dumps({"options": options}, ensure_ascii=False).encode("utf-8")
+        self.options_etag = f'"{hashlib.sha256(self.options_body).hexdigest()[:32]}"'
+
+    def functions(self, body_part: str) -> list[str]:
+        return list(self.by_body.get(body_part, ()))
+
+    # If-None-Match 헤더가 현재 ETag 와 일치하는지 (목록 / 약한 ETag / * 허용)
+    def etag_matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or self.options_etag in tags
+
+
+@lru_cache(maxsize=1)
+def get_catalog() -> BodyFunctionCatalog:
+    return BodyFunctionCatalog()
@@ -0,0 +1,102 @@
+## 기능 → 성분 매핑 (app/data/function_ingredient.json)
+## 시작 시 한 번 읽어 {기능: 정규화 성분 튜플} 로 컴파일, 파일 mtime 이 바뀌면 재시작 없이 다시 로드
+
+# 라이브러리 모음
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+FUNCTION_INGREDIENT_PATH = Path("app/data/function_ingredient.json")
+RELOAD_CHECK_INTERVAL = 1.0   # mtime 확인 주기(초), 요청마다 stat 하지 않도록
+
+_NORM_RE = re.compile(r"[^가-힣a-z0-9]+")
+
+
+# 정규화 함수(영양제 검색 성능 향상 위해 성분명 전처리)
+def normalize(text: str) -> str:
+    return _NORM_RE.sub("", text.lower())
+
+
+# "홍삼, 비타민C/아연" 형태의 매핑 문자열 → 정규화 성분 토큰 목록
+def parse_ingredients(raw: str) -> list[str]:
+    tokens = (normalize(ing) for part in raw.split(",") for ing in part.split("/") if ing.strip())
+    return [t for t in tokens if t]
+
+
+class FunctionIngredientMap:
+    def __init__(self, path: Path = FUNCTION_INGREDIENT_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime: int | None = None
+        self._failed_mtime: int | None = None   # 읽기 실패한 파일 버전 (같은 버전은 다시 읽지 않음)
+        self._checked = 0.0
+        self._raw: dict[str, str] = {}
+        self._map: dict[str, tuple[str, ...]] = {}
+        self._reload_if_changed(force=True)
+
+    def _reload_if_changed(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self._load_failed(e)   # 저장 중 잠깐 삭제/교체된 경우 등
+            return
+        if mtime == self._mtime or mtime == self._failed_mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                raw = self._read()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # 저장 도중(잘린 JSON 등)이면 다음 mtime 변경 때 다시 시도
+                self._failed_mtime = mtime
+                self._load_failed(e)
+                return
+            # dict 통째로 교체 → 읽는 쪽은 락 없이 항상 완전한 매핑을 봄
+            self._raw = raw
+            self._map = {fn: tuple(parse_ingredients(ing)) for fn, ing in raw.items()}
+            if self._mtime is not None:
+                print(f"[function_map] {self.path} 변경 감지 → 다시 로드 ({len(raw)}개 기능)")
+            self._mtime = mtime
+            self._failed_mtime = None
+
+    def _read(self) -> dict[str, str]:
+        with open(self.path, encoding="utf-8") as f:
+            fn_ing_map = json.load(f)
+        raw: dict[str, str] = {}
+        for itm in fn_ing_map:
+            # 같은 기능이 여러 번 나오면 첫 항목 사용 (기존 동작 유지)
+            raw.setdefault(itm["function"], itm.get("ingredient", ""))
+        return raw
+
+    # 최초 로드 실패는 그대로 예외, 이후 실패는 기존 매핑을 계속 사용
+    def _load_failed(self, error: Exception) -> None:
+        if self._mtime is None:
+            raise error
+        print(f"⚠️ [function_map] {self.path} 다시 로드 실패 → 기존 매핑 유지 ({len(self._raw)}개 기능): {error!r}")
+
+    def raw(self, function: str) -> str:
+        self._reload_if_changed()
+        return self._raw.get(function, "")
+
+    def get(self, function: str) -> tuple[str, ...]:
+        self._reload_if_changed()
+        return self._map.get(function, ())
+
+    # 전체 성분 토큰 (성분 역색인 사전 생성용)
+    def vocabulary(self) -> list[str]:
+        self._reload_if_changed()
+        return [t for ings in self._map.values() for t in ings]
+
+
+@lru_cache(maxsize=1)
+def get_function_map() -> FunctionIngredientMap:
+    return FunctionIngredientMap()
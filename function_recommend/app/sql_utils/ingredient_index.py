@@ -0,0 +1,108 @@
+## 성분 역색인 (정규화 성분 토큰 → 제품 행 번호)
+## 제품 ingredient 필드는 로딩 시 한 번만 정규화하고, 매핑 성분 전체를 Aho-Corasick 으로 한 번에 스캔
+## 요청 시에는 매핑 성분별 posting 합집합만 계산 → 비용이 카탈로그 크기가 아닌 결과 크기에 비례
+
+# 라이브러리 및 설정 가져오기
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+from app.sql_utils.product_store import get_product_store
+from app.sql_utils.function_map import get_function_map, normalize
+
+
+# 다중 패턴 부분 문자열 매칭
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[set[int]] = [set()]
+        for pid, pat in enumerate(self.patterns):
+            node = 0
+            for ch in pat:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                node = nxt
+            self._out[node].add(pid)
+        self._build_fail()
+
+    def _build_fail(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    # text 안에 등장하는 패턴 번호 집합
+    def find(self, text: str) -> set[int]:
+        found: set[int] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class IngredientIndex:
+    def __init__(self, fields: Iterable[str], vocabulary: Iterable[str]):
+        # 제품 ingredient 필드는 여기서 한 번만 정규화
+        self._fields = [normalize(f or "") for f in fields]
+        self._lock = threading.Lock()
+
+        matcher = AhoCorasick(vocabulary)
+        hits: list[list[int]] = [[] for _ in matcher.patterns]
+        for row, field in enumerate(self._fields):
+            for pid in matcher.find(field):
+                hits[pid].append(row)
+        self.postings: dict[str, list[int]] = dict(zip(matcher.patterns, hits))
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    # 사전에 없는 성분(매핑 파일 갱신 등)은 한 번 스캔 후 posting 에 추가
+    def _posting(self, token: str) -> list[int]:
+        rows = self.postings.get(token)
+        if rows is None:
+            rows = [row for row, field in enumerate(self._fields) if token in field]
+            with self._lock:
+                self.postings[token] = rows
+        return rows
+
+    # (행 수, 성분 수) 포함 여부 행렬 → 컨텍스트 순위화의 성분 커버리지 계산용
+    def coverage(self, rows: list[int], tokens: list[str]) -> np.ndarray:
+        rows_arr = np.asarray(rows, dtype=np.int64)
+        cov = np.zeros((len(rows_arr), len(tokens)), dtype=bool)
+        for j, t in enumerate(tokens):
+            cov[:, j] = np.isin(rows_arr, self._posting(t))
+        return cov
+
+    # 성분 중 하나라도 포함하는 제품 행 번호 (행 번호 순)
+    def lookup(self, tokens: Iterable[str]) -> list[int]:
+        rows: set[int] = set()
+        for t in tokens:
+            rows.update(self._posting(t))
+        return sorted(rows)
+
+
+# 프로세스당 한 번 생성
+@lru_cache(maxsize=1)
+def get_ingredient_index() -> IngredientIndex:
+    return IngredientIndex(get_product_store().column("ingredient"), get_function_map().vocabulary())
@@ -1,10 +1,19 @@
-## LLM 프롬프트 
+## 사용자 고민 → 기능 이름 매칭
+## 기능 이름(body_function.json)은 시작 시 한 번 임베딩, 요청 시에는 코사인 top-1 만 계산
+## 상위 2개 점수 차이가 FUNCTION_MATCH_MARGIN 보다 작을 때만 LLM 에게 선택을 맡김
 #추후 구체화 필요
 
 # 라이브러리 및 설정 가져오기
+from functools import lru_cache
 from typing import List, Optional
+
+import numpy as np
 from openai import OpenAI
 from app.config.settings import settings
+from app.rag.cache import LRUCache
+from app.rag.embeddings import get_embeddings, normalize_text
+from app.rag.rate_limiter import get_rate_limiter, estimate_tokens
+from app.sql_utils.catalog import BodyFunctionCatalog, get_catalog
 
 # LLM 호출 및 프롬프트
 _llm = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -21,11 +30,76 @@ def get_most_similar_function(user_input: str, candidates: List[str]) -> Optiona
 -> 기능 이름만 한 줄로 출력해.
 """
     try:
-        resp = _llm.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.0
+        resp = get_rate_limiter().call(
+            lambda: _llm.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role":"user","content":prompt}],
+                temperature=0.0
+            ),
+            tokens=estimate_tokens(prompt) + 50,
         )
         return resp.choices[0].message.content.strip()
     except Exception:
         return None
+
+
+class FunctionMatcher:
+    def __init__(self, catalog: BodyFunctionCatalog, margin: float = 0.05, cache_size: int = 1024):
+        self.margin = margin
+        self.embeddings = get_embeddings(settings.SUPPLEMENT_INDEX_DIR)
+        self.names = list(dict.fromkeys(f for funcs in catalog.options.values() for f in funcs if f))
+        self._row = {name: i for i, name in enumerate(self.names)}
+        self._matrix = self._normalize(np.asarray(self.embeddings.embed_documents(self.names), dtype=np.float32))
+        # (부위, 정규화 입력) → 매칭 결과
+        self._memo = LRUCache(cache_size)
+        self.llm_calls = 0
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        return m / np.where(norms > 0, norms, 1)
+
+    # 후보 기능별 코사인 유사도 (내림차순)
+    def rank(self, user_input: str, candidates: List[str]) -> list[tuple[str, float]]:
+        known = [c for c in candidates if c in self._row]
+        if not known:
+            return []
+        q = self._normalize(np.asarray(self.embeddings.embed_query(user_input), dtype=np.float32))
+        sims = self._matrix[[self._row[c] for c in known]] @ q
+        order = np.argsort(-sims)
+        return [(known[i], float(sims[i])) for i in order]
+
+    def match(self, body_part: str, user_input: str, candidates: List[str]) -> Optional[str]:
+        if not candidates:
+            return None
+        text = normalize_text(user_input)
+        key = (body_part, text)
+        best = self._memo.get(key)
+        if best is not None:
+            return best
+
+        if text in candidates:
+            best = text
+        else:
+            ranked = self.rank(text, candidates)
+            # 애매한 경우(상위 2개 점수 차이가 작음)만 LLM 호출, 후보 밖의 답이면 임베딩 1위 사용
+            if not ranked or (len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.margin):
+                self.llm_calls += 1
+                picked = get_most_similar_function(user_input, candidates)
+                picked = picked.strip().lstrip("-").strip() if picked else None
+                best = picked if picked in candidates else (ranked[0][0] if ranked else None)
+            else:
+                best = ranked[0][0]
+
+        if best is not None:
+            self._memo.put(key, best)
+        return best
+
+    def stats(self) -> dict:
+        return {"functions": len(self.names), "llm_calls": self.llm_calls, "memo": self._memo.stats()}
+
+
+# 프로세스당 한 번 기능 이름 임베딩
+@lru_cache(maxsize=1)
+def get_function_matcher() -> FunctionMatcher:
+    return FunctionMatcher(get_catalog(), settings.FUNCTION_MATCH_MARGIN, settings.FUNCTION_MATCH_CACHE_SIZE)
@@ -0,0 +1,30 @@
+## 제품 필터 비트맵 (행 번호 순 bool 마스크)
+## 알러지 키워드별로 caution 필드를 한 번만 스캔해 캐싱 → 성분 매칭 결과 필터링과 FAISS 검색 필터에 공용 사용
+
+# 라이브러리 및 설정 가져오기
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+from app.sql_utils.product_store import get_product_store
+
+
+# 주의사항(caution)에 키워드가 들어있는 제품 행 (소문자 비교, 기존 알러지 필터와 같은 기준)
+@lru_cache(maxsize=64)
+def caution_mask(keyword: str) -> np.ndarray:
+    cautions = get_product_store().column("caution")
+    mask = np.fromiter((keyword in c.lower() for c in cautions), dtype=bool, count=len(cautions))
+    mask.setflags(write=False)
+    return mask
+
+
+# 사용자 알러지 중 하나라도 주의사항에 있는 제품 (제외 대상), 알러지 없으면 None
+def allergy_mask(allergies: Iterable[str] | None) -> np.ndarray | None:
+    keys = sorted({a.lower() for a in allergies or ()})
+    if not keys:
+        return None
+    mask = caution_mask(keys[0]).copy()
+    for k in keys[1:]:
+        mask |= caution_mask(k)
+    return mask
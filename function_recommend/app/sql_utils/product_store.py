@@ -0,0 +1,101 @@
+## 제품 메타데이터 SQLite 저장소
+## 카탈로그 전체를 파이썬 객체로 들고 있지 않고, 요청된 행만 인덱스로 조회
+## (id 조회: /product/{product_id}, 행 번호 조회: FAISS 검색 결과, 컬럼 조회: 성분 필터링)
+
+# 라이브러리 및 설정 가져오기
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+from app.config.settings import settings
+
+# 자주 쓰는 필드는 별도 컬럼으로, 원본 dict 전체는 meta(JSON)로 보관
+FIELDS = ("id", "name", "ingredient", "function", "caution", "text")
+
+
+def build_product_db(db_path: str | Path, metas: Iterable[dict]) -> None:
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(f".tmp{os.getpid()}")
+    con = sqlite3.connect(tmp_path)
+    con.execute(
+        f"""CREATE TABLE products (
+               row_idx INTEGER PRIMARY KEY,
+               {", ".join(f"{f} TEXT" for f in FIELDS)},
+               meta    TEXT NOT NULL
+           )"""
+    )
+    con.executemany(
+        f"INSERT INTO products VALUES (?, {', '.join('?' * len(FIELDS))}, ?)",
+        (
+            (row, *[None if m.get(f) is None else str(m.get(f)) for f in FIELDS],
+             json.dumps(m, ensure_ascii=False, default=str))
+            for row, m in enumerate(metas)
+        ),
+    )
+    con.execute("CREATE INDEX idx_products_id ON products(id)")
+    con.commit()
+    con.close()
+    # 여러 워커가 동시에 만들어도 완성된 파일만 보이도록 교체
+    os.replace(tmp_path, db_path)
+
+
+class ProductStore:
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    # 읽기 전용 커넥션을 스레드별로 재사용
+    def _conn(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(f"file:{self.db_path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+            self._local.con = con
+        return con
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def get(self, product_id: str) -> Optional[dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT meta FROM products WHERE id = ? LIMIT 1", (str(product_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # FAISS 행 번호 → 메타 dict (요청된 행만 조회)
+    def get_rows(self, rows: Sequence[int]) -> dict[int, dict[str, Any]]:
+        found: dict[int, dict[str, Any]] = {}
+        rows = [int(r) for r in rows]
+        con = self._conn()
+        for i in range(0, len(rows), 500):
+            chunk = rows[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for row_idx, meta in con.execute(
+                f"SELECT row_idx, meta FROM products WHERE row_idx IN ({marks})", chunk
+            ):
+                found[row_idx] = json.loads(meta)
+        return found
+
+    # 필터링용 단일 컬럼 (행 번호 순서), 짧은 필드라 프로세스당 한 번만 읽어 캐싱
+    @lru_cache(maxsize=8)
+    def column(self, field: str) -> tuple[str, ...]:
+        if field not in FIELDS:
+            raise ValueError(f"지원하지 않는 컬럼: {field}")
+        return tuple(
+            v or "" for (v,) in self._conn().execute(f"SELECT {field} FROM products ORDER BY row_idx")
+        )
+
+
+# 프로세스당 하나의 저장소, DB 파일이 없으면 인덱스 메타데이터(index.pkl)로 최초 1회 생성
+@lru_cache(maxsize=1)
+def get_product_store() -> ProductStore:
+    db_path = Path(settings.PRODUCT_DB_PATH or Path(settings.SUPPLEMENT_INDEX_DIR) / "products.sqlite")
+    if not db_path.exists():
+        print(f"[ProductStore] {db_path} 없음 → index.pkl 로 생성")
+        with open(Path(settings.SUPPLEMENT_INDEX_DIR) / "index.pkl", "rb") as f:
+            build_product_db(db_path, pickle.load(f))
+    return ProductStore(db_path)
@@ -1,18 +1,12 @@
 ## 메타데이터 파일 필터링용 SQL 로직 정리  
 
 # 라이브러리 및 설정 가져오기
-import json
-from app.config.settings import settings
-from app.config.settings import BASE_DIR
+from app.sql_utils.catalog import get_catalog
 
-# 주요 로직
+# 주요 로직 (body_function.json 은 catalog 에서 한 번만 로드)
 def load_body_function_options() -> list[dict]:
-    with open(BASE_DIR / "data" / "body_function.json", encoding="utf-8") as f:
-        return json.load(f)
+    return get_catalog().rows
 
 
 def fetch_functions_by_body(body_part: str) -> list[str]:
-    for row in load_body_function_options():
-        if row["body"] == body_part:
-            return [fn.strip() for fn in row["function"].split(",")]
-    return []
\ No newline at end of file
+    return get_catalog().functions(body_part)
@@ -0,0 +1,5 @@
+## function_recommend 폴더에서 실행하는 것과 같이 `app` 패키지를 import 할 수 있도록 경로 추가
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
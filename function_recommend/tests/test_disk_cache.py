@@ -0,0 +1,18 @@
+## 디스크 캐시 크기 누계(cache_meta)가 덮어쓰기 / eviction 후에도 실제 합계와 같은지 확인
+from app.rag.cache import DiskCache
+
+
+def _real_total(cache: DiskCache) -> int:
+    return cache._conn().execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+
+def test_running_total_matches_after_replace_and_evict(tmp_path):
+    cache = DiskCache(tmp_path / "cache.sqlite", max_bytes=1000)
+    for i in range(60):
+        cache.put(f"k{i % 25}", b"x" * (10 + i))     # 같은 키 덮어쓰기 + 용량 초과 eviction
+    assert cache.stats()["bytes"] == _real_total(cache)
+    assert cache.stats()["bytes"] <= 1000
+
+    # 다시 열어도 누계 유지
+    reopened = DiskCache(tmp_path / "cache.sqlite", max_bytes=1000)
+    assert reopened.stats()["bytes"] == _real_total(reopened)
@@ -0,0 +1,56 @@
+## 기능 → 성분 매핑 핫 리로드: 저장 도중의 깨진/삭제된 파일은 무시하고 기존 매핑을 계속 사용
+import json
+import os
+
+import pytest
+
+from app.sql_utils import function_map
+from app.sql_utils.function_map import FunctionIngredientMap
+
+GOOD = [{"function": "눈 건강", "ingredient": "루테인, 비타민A"}]
+
+
+@pytest.fixture
+def fmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(function_map, "RELOAD_CHECK_INTERVAL", 0.0)
+    path = tmp_path / "function_ingredient.json"
+    path.write_text(json.dumps(GOOD, ensure_ascii=False), encoding="utf-8")
+    return FunctionIngredientMap(path)
+
+
+def _touch_later(path):
+    # 같은 mtime 으로 보이지 않도록 수정 시각을 확실히 바꿈
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("broken", ['[{"function": "눈 건', '[{"ingredient": "루테인"}]', ""])
+def test_broken_file_keeps_previous_mapping(fmap, broken):
+    assert fmap.get("눈 건강") == ("루테인", "비타민a")
+    fmap.path.write_text(broken, encoding="utf-8")
+    _touch_later(fmap.path)
+
+    assert fmap.get("눈 건강") == ("루테인", "비타민a")
+    assert fmap.raw("눈 건강") == "루테인, 비타민A"
+
+
+def test_deleted_file_keeps_previous_mapping(fmap):
+    fmap.path.unlink()
+    assert fmap.get("눈 건강") == ("루테인", "비타민a")
+
+
+def test_recovers_after_fixed_save(fmap):
+    fmap.path.write_text("[", encoding="utf-8")
+    _touch_later(fmap.path)
+    assert fmap.get("눈 건강") == ("루테인", "비타민a")
+
+    fixed = GOOD + [{"function": "간 건강", "ingredient": "밀크씨슬"}]
+    fmap.path.write_text(json.dumps(fixed, ensure_ascii=False), encoding="utf-8")
+    _touch_later(fmap.path)
+    _touch_later(fmap.path)
+    assert fmap.get("간 건강") == ("밀크씨슬",)
+
+
+def test_initial_load_failure_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FunctionIngredientMap(tmp_path / "missing.json")
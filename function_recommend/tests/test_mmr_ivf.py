@@ -0,0 +1,62 @@
+## ivf_flat 인덱스에서도 행 번호 → 벡터 복원이 되어 MMR 재정렬이 동작하는지 확인
+from types import SimpleNamespace
+
+import faiss
+import numpy as np
+import pytest
+
+from app.rag.faiss_utils import ensure_direct_map, make_index, mmr_select, read_index_mmap, train_and_add
+
+DIM = 16
+K = 4
+
+
+# 질의와 거의 같은 near-duplicate 20개 + 조금 덜 비슷하지만 서로 다른 방향 후보들
+def _corpus() -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    query = np.zeros(DIM, dtype=np.float32)
+    query[0] = 1.0
+    dups = query + rng.normal(0, 0.01, (20, DIM)).astype(np.float32)
+    others = []
+    for axis in range(1, DIM):
+        v = query * 0.7
+        v[axis] = 0.7
+        others.append(v)
+    noise = rng.normal(0, 1, (400, DIM)).astype(np.float32)
+    return np.vstack([dups, np.asarray(others, dtype=np.float32), noise]), query
+
+
+def _mmr_rows(index: faiss.Index, query: np.ndarray, pool: int) -> tuple[list[int], list[int]]:
+    faiss.extract_index_ivf(index).nprobe = 8
+    _, ids = index.search(query.reshape(1, -1), pool)
+    rows = [int(r) for r in ids[0] if r >= 0]
+    vectors = index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+    picked = [rows[i] for i in mmr_select(query, vectors, K, lambda_=0.3)]
+    return rows, picked
+
+
+def _check_diversified(rows: list[int], picked: list[int]) -> None:
+    assert len(picked) == K
+    assert set(rows[:K]) <= set(range(20))          # 순수 top-k 는 near-duplicate 만
+    assert any(r >= 20 for r in picked)             # MMR 은 다른 방향 후보를 섞음
+
+
+def test_mmr_on_ivf_flat_mmap(tmp_path):
+    vectors, query = _corpus()
+    index = ensure_direct_map(train_and_add(make_index(DIM, "ivf_flat", nlist=8), vectors))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+
+    loaded = ensure_direct_map(read_index_mmap(tmp_path / "index.faiss", "ivf_flat"))
+    _check_diversified(*_mmr_rows(loaded, query, pool=40))
+
+
+def test_mmr_on_ivf_flat_build(tmp_path):
+    build_index = pytest.importorskip("app.rag.build_index")
+    vectors, query = _corpus()
+    args = SimpleNamespace(index_type="ivf_flat", nlist=8, pq_m=4, pq_bits=8, hnsw_m=32, ef_construction=200)
+    index = build_index.build_faiss(vectors, args)
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+
+    # 로드할 때 direct map 을 다시 만들지 않아도 저장된 것으로 복원 가능해야 함
+    loaded = read_index_mmap(tmp_path / "index.faiss", "ivf_flat")
+    _check_diversified(*_mmr_rows(loaded, query, pool=40))
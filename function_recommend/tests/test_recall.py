@@ -0,0 +1,20 @@
+## 빌드 리포트 recall@k: k 가 벡터 수보다 커도 -1 패딩을 적중으로 세지 않음
+import faiss
+import numpy as np
+
+from app.rag.faiss_utils import make_index, recall_at_k, train_and_add
+
+
+def test_recall_small_flat_index_is_exact():
+    vectors = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32)
+    index = train_and_add(make_index(8, "flat"), vectors)
+    assert recall_at_k(index, vectors, k=10) == 1.0
+
+
+def test_recall_ignores_missing_results():
+    vectors = np.random.default_rng(1).normal(size=(50, 8)).astype(np.float32)
+    # 절반만 들어 있는 인덱스 → 나머지는 찾을 수 없음
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors[:25])
+    recall = recall_at_k(index, vectors, k=60)
+    assert 0.4 <= recall <= 0.6
@@ -17,6 +17,16 @@ MSD_MANUAL_JSON_PATH   = os.getenv("MSD_MANUAL_JSON_PATH",
 
 LOG_LEVEL              = os.getenv("LOG_LEVEL", "INFO")
 OCR_ENGINE_PATH        = os.getenv("OCR_ENGINE_PATH", "/usr/local/bin/tesseract")
+# 스캔 PDF: 추출 글자 수가 OCR_MIN_TEXT_CHARS 미만인 페이지는 OCR_DPI 로 래스터화해서 OCR
+# (아래 OCR 설정은 OCR 캐시 키에 포함됨 → 새 설정을 추가하면 ocr_cache.OCR_SETTINGS 에도 추가)
+OCR_DPI                = int(os.getenv("OCR_DPI", "300"))
+OCR_MIN_TEXT_CHARS     = int(os.getenv("OCR_MIN_TEXT_CHARS", "20"))
+# tesseract 전 이미지 전처리 단계 (preprocess.py, 쉼표로 구분 · 순서대로 적용, 빈 값이면 그레이스케일만)
+OCR_PREPROCESS         = os.getenv("OCR_PREPROCESS", "resize,binarize,deskew,crop")
+OCR_TARGET_DPI         = int(os.getenv("OCR_TARGET_DPI", "300"))    # A4 기준 해상도로 축소/확대
+OCR_THRESH_BLOCK       = int(os.getenv("OCR_THRESH_BLOCK", "31"))   # 적응형 이진화 주변 영역 크기(px, 홀수)
+OCR_THRESH_C           = int(os.getenv("OCR_THRESH_C", "15"))       # 주변 평균에서 빼는 값 (클수록 옅은 잡음 제거)
+OCR_MAX_SKEW           = float(os.getenv("OCR_MAX_SKEW", "10"))     # 이 각도(도)를 넘는 기울기는 오검출로 보고 보정 안 함
 
 # (필요 시 그대로 유지)
 S3_BUCKET              = os.getenv("S3_BUCKET", "")
@@ -25,3 +35,16 @@ AWS_ACCESS_KEY_ID      = os.getenv("AWS_ACCESS_KEY_ID", "")
 AWS_SECRET_ACCESS_KEY  = os.getenv("AWS_SECRET_ACCESS_KEY", "")
 API_TIMEOUT_SECONDS    = int(os.getenv("API_TIMEOUT_SECONDS", "30"))
 RETRY_COUNT            = int(os.getenv("RETRY_COUNT", "3"))
+
+# ✅ /analyze_exam 작업 풀 (OCR: 프로세스 풀, LLM 등 블로킹 I/O: 스레드 풀)
+OCR_WORKERS            = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+LLM_WORKERS            = int(os.getenv("LLM_WORKERS", "8"))
+# 동시에 받아들이는 최대 요청 수 (실행 중 + 대기), 넘치면 429 + Retry-After
+MAX_PENDING_JOBS       = int(os.getenv("MAX_PENDING_JOBS", str((os.cpu_count() or 2) * 4)))
+RETRY_AFTER_SECONDS    = int(os.getenv("RETRY_AFTER_SECONDS", "10"))
+# PDF 1건당 동시에 추출하는 최대 페이지 수 (모든 검사값을 찾으면 나머지 페이지는 취소)
+PDF_PAGE_WINDOW        = int(os.getenv("PDF_PAGE_WINDOW", str(OCR_WORKERS)))
+
+# ✅ OCR 결과 캐시 (파일 내용 SHA-256 + file_type + 추출기 버전 기준, 용량 초과 시 오래 안 쓴 것부터 삭제)
+OCR_CACHE_PATH         = os.getenv("OCR_CACHE_PATH", "cache/ocr_cache.sqlite")
+OCR_CACHE_MAX_MB       = int(os.getenv("OCR_CACHE_MAX_MB", "200"))   # 0 이면 캐시 사용 안 함
@@ -0,0 +1,104 @@
+# executor.py
+# /analyze_exam 작업 실행기
+# - OCR / PDF 추출(CPU 사용): 프로세스 풀 → 코어 수만큼 병렬(스캔 PDF 는 페이지별 OCR), 이벤트 루프는 막히지 않음
+# - OpenAI 호출 등 블로킹 I/O: 스레드 풀
+# - 입장 제한: 실행 중 + 대기 요청이 MAX_PENDING_JOBS 를 넘으면 바로 거절 (429, Retry-After)
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import partial
+
+import config
+
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나 작업 풀을 사용할 수 없음 → status_code 로 응답 (Retry-After 포함)"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+_lock = threading.Lock()
+_process_pool: ProcessPoolExecutor | None = None
+_thread_pool: ThreadPoolExecutor | None = None
+_pending = 0
+
+
+def _init_worker() -> None:
+    # 스캔 PDF 는 페이지마다 워커 하나가 tesseract 를 돌리므로 tesseract 자체 멀티스레드(OpenMP)는 끔
+    # (워커 수 × 스레드 수로 코어가 과점유되지 않도록)
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=config.OCR_WORKERS, initializer=_init_worker)
+        return _process_pool
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=config.LLM_WORKERS, thread_name_prefix="llm")
+        return _thread_pool
+
+
+@asynccontextmanager
+async def admission():
+    """요청 1건 입장. 자리가 없으면 기다리지 않고 Overloaded(429)"""
+    global _pending
+    if _pending >= config.MAX_PENDING_JOBS:
+        raise Overloaded(429, config.RETRY_AFTER_SECONDS, "분석 요청이 많습니다. 잠시 후 다시 시도해주세요.")
+    _pending += 1
+    try:
+        yield
+    finally:
+        _pending -= 1
+
+
+async def run_cpu(fn, *args):
+    """CPU 작업(OCR 등)을 프로세스 풀에서 실행. 워커 프로세스가 죽었으면 풀을 새로 만들고 503"""
+    global _process_pool
+    pool = _get_process_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, partial(fn, *args))
+    except BrokenProcessPool:
+        with _lock:
+            if _process_pool is pool:
+                _process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise Overloaded(503, config.RETRY_AFTER_SECONDS, "OCR 작업자를 재시작하는 중입니다. 잠시 후 다시 시도해주세요.")
+
+
+async def run_io(fn, *args):
+    """블로킹 I/O(OpenAI 호출, 파일 읽기 등)를 스레드 풀에서 실행"""
+    return await asyncio.get_running_loop().run_in_executor(_get_thread_pool(), partial(fn, *args))
+
+
+def stats() -> dict:
+    return {
+        "pending": _pending,
+        "max_pending": config.MAX_PENDING_JOBS,
+        "ocr_workers": config.OCR_WORKERS,
+        "llm_workers": config.LLM_WORKERS,
+    }
+
+
+def shutdown() -> None:
+    global _process_pool, _thread_pool
+    with _lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = _thread_pool = None
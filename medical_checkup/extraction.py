@@ -0,0 +1,50 @@
+# extraction.py
+# 검진 결과지 텍스트 추출 + 검사값 매칭 (비동기, executor 프로세스 풀 사용)
+# - PDF: 페이지별 추출을 프로세스 풀에 나눠 보내고(최대 PDF_PAGE_WINDOW 페이지 앞서), 페이지 순서대로 도착하는 대로 매칭
+#        텍스트 레이어 없는 페이지(스캔본)는 워커 안에서 래스터화 후 OCR → 스캔 PDF 도 코어 수만큼 병렬 OCR
+#        PATTERNS 항목을 모두 찾으면 남은 페이지는 취소 → 검사값이 앞쪽에 있는 긴 결과지는 뒷 페이지를 읽지 않음
+# - 이미지: tesseract OCR 1회 후 매칭
+
+import asyncio
+
+import config
+from executor import run_cpu
+from pipeline import all_fields_found, extract_image_text, extract_pdf_page, match_fields, pdf_page_count
+
+
+async def extract_pdf(file_bytes: bytes) -> tuple[dict, str]:
+    n_pages = await run_cpu(pdf_page_count, file_bytes)
+    window = max(1, config.PDF_PAGE_WINDOW)
+    pending: dict[int, asyncio.Future] = {}
+    next_page = 0
+    text, result = "", {}
+    try:
+        for page_no in range(n_pages):
+            # 현재 페이지부터 window 개까지 미리 제출 (앞 페이지를 기다리는 동안 뒷 페이지 추출)
+            while next_page < min(n_pages, page_no + window):
+                pending[next_page] = asyncio.ensure_future(run_cpu(extract_pdf_page, file_bytes, next_page))
+                next_page += 1
+            text += await pending.pop(page_no) + "\n"
+            result = match_fields(text)
+            if all_fields_found(result):
+                if page_no + 1 < n_pages:
+                    print(f"[OCR] {page_no + 1}/{n_pages} 페이지에서 모든 항목 추출 → 나머지 페이지 생략")
+                break
+    finally:
+        # 아직 시작 안 한 페이지는 풀에서 빠지고, 실행 중인 페이지 결과는 버림
+        for task in pending.values():
+            task.cancel()
+    return result, text
+
+
+async def extract_fields(file_bytes: bytes, file_type: str) -> tuple[dict, str]:
+    if file_type == "pdf":
+        result, text = await extract_pdf(file_bytes)
+    else: # 이미지 파일 처리
+        text = await run_cpu(extract_image_text, file_bytes)
+        result = match_fields(text)
+
+    print("---- OCR 결과 ----") # OCR 결과 확인용 (디버깅 시)
+    print(text)
+    print("--------------------")
+    return result, text
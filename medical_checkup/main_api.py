@@ -7,10 +7,14 @@ import pandas as pd
 
 # 너의 로컬 분석 함수들 import
 from pipeline import (
-    parse_health_exam, load_reference, find_abnormal,
+    load_reference, find_abnormal,
     get_ingredients_from_abnormal_tuple, load_ingredient_info,
     load_msd_manual, recommend_products, build_structured_data
 )
+import executor
+from executor import Overloaded, admission, run_io
+from extraction import extract_fields
+from ocr_cache import cache_key, get_ocr_cache
 
 app = FastAPI()
 
@@ -22,6 +26,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 2 ~ 5단계: 기준표 비교 → 성분/제품 추천 → GPT 응답 (파일 읽기 + OpenAI 호출이라 스레드 풀에서 실행)
+def recommend_from_exam(exam_dict: dict, user_name: str, gender: str) -> dict:
+    # 2. 기준표 기반 이상치 탐지
+    reference = load_reference()
+    abnormal = find_abnormal(exam_dict, reference, gender)
+
+    # 3. 성분 추천
+    ingredients = get_ingredients_from_abnormal_tuple(abnormal)
+
+    # 4. 제품 추천
+    try:
+        supplements_df = pd.read_json("data/supplements.json")
+    except FileNotFoundError:
+        supplements_df = pd.DataFrame()
+    products = recommend_products(ingredients, supplements_df.to_dict("records"))
+
+    # 5. GPT 응답 구성
+    ing_info_df = load_ingredient_info()
+    msd_manual = load_msd_manual()
+    return build_structured_data(
+        exam_dict, abnormal, ingredients, products,
+        ing_info_df, msd_manual, user_name
+    )
+
+
+# 1단계: OCR + 검사값 추출 (같은 파일·형식·추출기 버전이면 캐시 사용, 아니면 프로세스 풀에서 페이지별 추출)
+async def extract_exam(contents: bytes, file_type: str) -> tuple[dict, str, bool]:
+    cache = get_ocr_cache()
+    if cache is None:
+        exam_dict, ocr_text = await extract_fields(contents, file_type)
+        return exam_dict, ocr_text, False
+
+    key = await run_io(cache_key, contents, file_type)
+    hit = await run_io(cache.get, key)
+    if hit is not None:
+        return *hit, True
+    exam_dict, ocr_text = await extract_fields(contents, file_type)
+    await run_io(cache.put, key, exam_dict, ocr_text)
+    return exam_dict, ocr_text, False
+
+
 @app.post("/analyze_exam")
 async def analyze_exam(
     file: UploadFile = File(...),
@@ -30,39 +75,41 @@ async def analyze_exam(
     file_type: str = Form(...)
 ):
     try:
-        contents = await file.read()
-
-        # 1. OCR + 검사값 추출
-        exam_dict, ocr_text = parse_health_exam(contents, file_type)
-
-        # 2. 기준표 기반 이상치 탐지
-        reference = load_reference()
-        abnormal = find_abnormal(exam_dict, reference, gender)
-
-        # 3. 성분 추천
-        ingredients = get_ingredients_from_abnormal_tuple(abnormal)
-
-        # 4. 제품 추천
-        try:
-            supplements_df = pd.read_json("data/supplements.json")
-        except FileNotFoundError:
-            supplements_df = pd.DataFrame()
-        products = recommend_products(ingredients, supplements_df.to_dict("records"))
-
-        # 5. GPT 응답 구성
-        ing_info_df = load_ingredient_info()
-        msd_manual = load_msd_manual()
-        output = build_structured_data(
-            exam_dict, abnormal, ingredients, products,
-            ing_info_df, msd_manual, user_name
-        )
+        # 대기열이 가득 차면 바로 429 (요청이 계속 쌓이지 않도록)
+        async with admission():
+            contents = await file.read()
+
+            # 1. OCR + 검사값 추출 (캐시 → 프로세스 풀)
+            exam_dict, ocr_text, ocr_cached = await extract_exam(contents, file_type)
+
+            # 2 ~ 5. 추천 + GPT 응답 (스레드 풀)
+            output = await run_io(recommend_from_exam, exam_dict, user_name, gender)
 
         # 6. JSON 응답 반환
         return {
             "gpt_response": output["gpt_response"],
             "structured_data": output["structured_data"],
-            "ocr_text": ocr_text
+            "ocr_text": ocr_text,
+            "ocr_cached": ocr_cached
         }
 
+    except Overloaded as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"error": e.detail},
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# 작업 풀 상태 확인용
+@app.get("/analyze_exam/stats")
+def analyze_exam_stats():
+    cache = get_ocr_cache()
+    return {**executor.stats(), "ocr_cache": cache.stats() if cache is not None else None}
+
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    executor.shutdown()
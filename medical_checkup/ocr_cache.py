@@ -0,0 +1,115 @@
+# ocr_cache.py
+# 건강검진 파일 OCR 결과 캐시
+# 같은 파일을 다시 올리면(성별만 바꿔 재분석 등) OCR / PDF 추출을 건너뜀
+# 키: SHA-256(파일 바이트) + file_type + EXTRACTOR_VERSION + OCR 설정값, 값: (exam_dict, ocr_text)
+# SQLite 파일 하나에 저장 → 여러 워커 프로세스가 공유, 용량 초과 시 가장 오래 안 쓴 항목부터 삭제
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import config
+from pipeline import EXTRACTOR_VERSION
+
+# 추출 결과를 바꾸는 설정 (OCR 관련 설정을 추가하면 여기에도 추가) → 값이 바뀌면 이전 결과는 조회되지 않음
+OCR_SETTINGS = (
+    "OCR_DPI", "OCR_MIN_TEXT_CHARS",
+    "OCR_PREPROCESS", "OCR_TARGET_DPI", "OCR_THRESH_BLOCK", "OCR_THRESH_C", "OCR_MAX_SKEW",
+)
+
+
+def settings_fingerprint() -> str:
+    return json.dumps({name: getattr(config, name) for name in OCR_SETTINGS}, sort_keys=True)
+
+
+def cache_key(file_bytes: bytes, file_type: str) -> str:
+    h = hashlib.sha256(file_bytes)
+    h.update(f"\x00{file_type}\x00{EXTRACTOR_VERSION}\x00{settings_fingerprint()}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class OcrCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        con = self._conn()
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            """CREATE TABLE IF NOT EXISTS ocr_cache (
+                   key      TEXT PRIMARY KEY,
+                   value    TEXT NOT NULL,
+                   size     INTEGER NOT NULL,
+                   accessed REAL NOT NULL
+               )"""
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_accessed ON ocr_cache(accessed)")
+
+    # 스레드마다 별도 커넥션 (스레드 풀에서 호출)
+    def _conn(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.con = con
+        return con
+
+    def get(self, key: str) -> tuple[dict, str] | None:
+        con = self._conn()
+        row = con.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        con.execute("UPDATE ocr_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        value = json.loads(row[0])
+        return value["exam_dict"], value["ocr_text"]
+
+    def put(self, key: str, exam_dict: dict, ocr_text: str) -> None:
+        value = json.dumps({"exam_dict": exam_dict, "ocr_text": ocr_text}, ensure_ascii=False)
+        con = self._conn()
+        con.execute(
+            "INSERT OR REPLACE INTO ocr_cache(key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, len(value.encode("utf-8")), time.time()),
+        )
+        self._evict(con)
+
+    # 용량 초과 시 오래 사용되지 않은 항목부터 삭제 (목표: 최대 용량의 90%)
+    def _evict(self, con: sqlite3.Connection) -> None:
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for key, size in con.execute("SELECT key, size FROM ocr_cache ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= target:
+                break
+        con.executemany("DELETE FROM ocr_cache WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        count, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache"
+        ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+_cache: OcrCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> OcrCache | None:
+    """프로세스당 하나, OCR_CACHE_MAX_MB 가 0 이면 None (캐시 사용 안 함)"""
+    global _cache
+    if config.OCR_CACHE_MAX_MB <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache(config.OCR_CACHE_PATH, config.OCR_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
@@ -3,11 +3,13 @@
 import io
 import re
 import json
+import time
 import pandas as pd
 import pdfplumber
 import pytesseract
 from PIL import Image
 import config
+from preprocess import preprocess_image
 from openai import OpenAI 
 
 # OpenAI 클라이언트 초기화
@@ -73,34 +75,66 @@ def generate_openai_response(user_name: str, structured_data: dict) -> str:
         # 실제 서비스에서는 사용자에게 좀 더 친절한 오류 메시지를 반환하는 것이 좋습니다.
         return "죄송합니다. AI 응답을 생성하는 데 문제가 발생했습니다. 잠시 후 다시 시도해주세요."
 
+# 추출 로직(패턴, OCR 설정 등)을 바꾸면 올려서 OCR 캐시 무효화
+EXTRACTOR_VERSION = "4"
+
+# 추출 대상 검사 항목 (8개) → 모두 찾으면 나머지 페이지는 읽지 않음
+PATTERNS = {
+    "혈색소": r"혈색소\s*\(g/dL\)?[^0-9]*(\d+\.\d+)", # 검사명과 숫자 사이 다른 문자 허용
+    "공복혈당":  r"공복혈당[^0-9]*?(\d+\.?\d*)",
+    "BMI":      r"(?:BMI|체질량지수)[^0-9]*?(\d+\.?\d*)",
+    "허리둘레":  r"허리둘레[^0-9]*?(\d+\.?\d*)",
+    "AST":      r"AST\(SGOT\)[^0-9]*?(\d+\.?\d*)|AST[^0-9]*?(\d+\.?\d*)", # AST(SGOT) 또는 AST
+    "ALT":      r"ALT\(SGPT\)[^0-9]*?(\d+\.?\d*)|ALT[^0-9]*?(\d+\.?\d*)", # ALT(SGPT) 또는 ALT
+    "감마GTP":  r"(?:감마지티피|감마GTP|\ ?-GTP)[^0-9]*?(\d+\.?\d*)", # 다양한 감마GTP 표현
+    "요단백":    r"요단백[^■]*?■\s*([가-힣]+)" # 상태 값을 직접 추출 (예: 정상, 경계, 양성 등)
+}
+
+
 # --- 기존 함수들은 그대로 사용 ---
-def parse_health_exam(file_bytes: bytes, file_type: str) -> tuple[dict,str]:
-    text = ""
-    if file_type == "pdf":
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text() or "" # Ensure page_text is not None
-                text += page_text + "\n"
-    else: # 이미지 파일 처리
-        img = Image.open(io.BytesIO(file_bytes))
-        text = pytesseract.image_to_string(img, lang="kor+eng") # tesseract OCR 사용
-
-    patterns = {
-        "혈색소": r"혈색소\\s*\\(g/dL\\)?[^0-9]*(\\d+\\.\\d+)", # 검사명과 숫자 사이 다른 문자 허용
-        "공복혈당":  r"공복혈당[^0-9]*?(\d+\.?\d*)",
-        "BMI":      r"(?:BMI|체질량지수)[^0-9]*?(\d+\.?\d*)",
-        "허리둘레":  r"허리둘레[^0-9]*?(\d+\.?\d*)",
-        "AST":      r"AST\(SGOT\)[^0-9]*?(\d+\.?\d*)|AST[^0-9]*?(\d+\.?\d*)", # AST(SGOT) 또는 AST
-        "ALT":      r"ALT\(SGPT\)[^0-9]*?(\d+\.?\d*)|ALT[^0-9]*?(\d+\.?\d*)", # ALT(SGPT) 또는 ALT
-        "감마GTP":  r"(?:감마지티피|감마GTP|\ ?-GTP)[^0-9]*?(\d+\.?\d*)", # 다양한 감마GTP 표현
-        "요단백":    r"요단백[^■]*?■\s*([가-힣]+)" # 상태 값을 직접 추출 (예: 정상, 경계, 양성 등)
-    }
+# 1) 텍스트 추출: PDF 는 페이지 단위, 이미지는 tesseract OCR
+#    텍스트 레이어가 없는 페이지(휴대폰 스캔 PDF 등)는 OCR_DPI 로 래스터화해서 OCR
+def pdf_page_count(file_bytes: bytes) -> int:
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return len(pdf.pages)
 
-    result = {}
-    print("---- OCR 결과 ----") # OCR 결과 확인용 (디버깅 시)
-    print(text)
-    print("--------------------")
 
+def ocr_image(img: Image.Image) -> str:
+    # 축소 · 이진화 · 기울기 보정 · 여백 제거 후 tesseract OCR (단계별 소요 시간 출력)
+    pre, timings = preprocess_image(img)
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(pre, lang="kor+eng") # tesseract OCR 사용
+    timings["tesseract"] = (time.perf_counter() - start) * 1000
+    stages = ", ".join(f"{k} {v:.0f}ms" for k, v in timings.items())
+    print(f"[OCR] {img.size[0]}x{img.size[1]} → {pre.shape[1]}x{pre.shape[0]}: {stages}")
+    return text
+
+
+def page_text(page) -> str:
+    text = page.extract_text() or "" # Ensure page_text is not None
+    if len(text.strip()) >= config.OCR_MIN_TEXT_CHARS:
+        return text
+    # 이미지만 있는 페이지 → 래스터화 후 OCR (더 많이 읽힌 쪽 사용)
+    img = page.to_image(resolution=config.OCR_DPI).original
+    ocr_text = ocr_image(img)
+    print(f"[OCR] {page.page_number} 페이지 텍스트 레이어 없음 → OCR ({config.OCR_DPI} DPI)")
+    return ocr_text if len(ocr_text.strip()) > len(text.strip()) else text
+
+
+def extract_pdf_page(file_bytes: bytes, page_no: int) -> str:
+    # 프로세스 풀 워커에서 페이지별로 호출 (각자 PDF 를 열어 해당 페이지만 추출/OCR)
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return page_text(pdf.pages[page_no])
+
+
+def extract_image_text(file_bytes: bytes) -> str:
+    return ocr_image(Image.open(io.BytesIO(file_bytes)))
+
+
+# 2) 검사값 매칭: 지금까지 모인 텍스트에서 PATTERNS 항목 찾기 (페이지가 도착할 때마다 다시 호출 가능)
+def match_fields(text: str) -> dict:
+    patterns = PATTERNS
+    result = {}
     for key, pat in patterns.items():
         # AST, ALT의 경우 두 가지 패턴을 시도
         if key == "AST" or key == "ALT":
@@ -143,6 +177,31 @@ def parse_health_exam(file_bytes: bytes, file_type: str) -> tuple[dict,str]:
             # print(f"Warning: Could not convert value for '{key}' ('{val_str}') to float.")
             result[key] = val_str # 변환 실패 시 문자열로 저장 또는 다른 처리
             
+    return result
+
+
+def all_fields_found(result: dict) -> bool:
+    return len(result) == len(PATTERNS)
+
+
+# 순차 버전 (단독 실행/테스트용): 페이지 순서대로 추출하며 모든 항목을 찾으면 중단
+def parse_health_exam(file_bytes: bytes, file_type: str) -> tuple[dict,str]:
+    text = ""
+    result = {}
+    if file_type == "pdf":
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            for page in pdf.pages:
+                text += page_text(page) + "\n"
+                result = match_fields(text)
+                if all_fields_found(result):
+                    break
+    else: # 이미지 파일 처리
+        text = extract_image_text(file_bytes)
+        result = match_fields(text)
+
+    print("---- OCR 결과 ----") # OCR 결과 확인용 (디버깅 시)
+    print(text)
+    print("--------------------")
     return result, text
 
 def load_reference() -> dict:
@@ -0,0 +1,98 @@
+# preprocess.py
+# tesseract 전 이미지 전처리 (cv2) → 픽셀 수를 줄이고 배경/기울기를 정리해서 OCR 시간 단축 + 인식률 향상
+# 단계 (config.OCR_PREPROCESS 순서대로, 빈 값이면 그레이스케일만)
+# - resize:   A4 짧은 변 기준 OCR_TARGET_DPI 해상도로 맞춤 (12MP 휴대폰 사진 → 약 2500px)
+# - binarize: 적응형 이진화 (조명 얼룩/그림자에도 글자만 남김)
+# - deskew:   글자 영역 기울기 보정 (±OCR_MAX_SKEW 도 이내만)
+# - crop:     글자가 없는 바깥 여백 제거
+# 단계별 소요 시간(ms)을 함께 반환
+
+import time
+
+import cv2
+import numpy as np
+
+import config
+
+A4_SHORT_INCH = 8.27  # 결과지 용지(A4) 짧은 변 길이
+
+
+def to_gray(img) -> np.ndarray:
+    """PIL.Image / numpy 배열 → 8bit 그레이스케일"""
+    arr = np.asarray(img.convert("RGB") if hasattr(img, "convert") else img)
+    if arr.ndim == 3:
+        arr = cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+    return np.ascontiguousarray(arr, dtype=np.uint8)
+
+
+def _ink_mask(gray: np.ndarray) -> np.ndarray:
+    """글자(어두운 픽셀) = 255 마스크, 작은 점 잡음은 제거"""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+
+def resize(gray: np.ndarray) -> np.ndarray:
+    target = config.OCR_TARGET_DPI * A4_SHORT_INCH
+    scale = min(target / min(gray.shape[:2]), 2.0)  # 작은 이미지는 최대 2배까지만 확대
+    if abs(scale - 1.0) < 0.1:
+        return gray
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interp)
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    block = config.OCR_THRESH_BLOCK | 1  # 홀수여야 함
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, config.OCR_THRESH_C
+    )
+
+
+def skew_angle(gray: np.ndarray) -> float:
+    """글자 픽셀을 감싸는 최소 회전 사각형의 각도 → (-45, 45] 도"""
+    points = cv2.findNonZero(_ink_mask(gray))
+    if points is None or len(points) < 100:
+        return 0.0
+    angle = cv2.minAreaRect(points)[-1]
+    if angle > 45:
+        angle -= 90
+    elif angle <= -45:
+        angle += 90
+    return float(angle)
+
+
+def deskew(gray: np.ndarray) -> np.ndarray:
+    angle = skew_angle(gray)
+    if abs(angle) < 0.1 or abs(angle) > config.OCR_MAX_SKEW:
+        return gray
+    h, w = gray.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def crop(gray: np.ndarray) -> np.ndarray:
+    points = cv2.findNonZero(_ink_mask(gray))
+    if points is None:
+        return gray
+    x, y, w, h = cv2.boundingRect(points)
+    pad = max(gray.shape[:2]) // 100  # 가장자리 글자가 잘리지 않도록 약간 여유
+    return gray[max(y - pad, 0):y + h + pad, max(x - pad, 0):x + w + pad]
+
+
+STAGES = {"resize": resize, "binarize": binarize, "deskew": deskew, "crop": crop}
+
+
+def preprocess_image(img, stages: list[str] | None = None) -> tuple[np.ndarray, dict[str, float]]:
+    """설정된 단계를 순서대로 적용 → (OCR 입력 이미지, 단계별 소요 ms)"""
+    if stages is None:
+        stages = [s.strip() for s in config.OCR_PREPROCESS.split(",") if s.strip()]
+    timings = {}
+    start = time.perf_counter()
+    out = to_gray(img)
+    timings["gray"] = (time.perf_counter() - start) * 1000
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"지원하지 않는 전처리 단계: {name} (가능: {', '.join(STAGES)})")
+        start = time.perf_counter()
+        out = STAGES[name](out)
+        timings[name] = (time.perf_counter() - start) * 1000
+    return out, timings
@@ -0,0 +1,7 @@
+# conftest.py
+# medical_checkup 모듈은 서로 `import config` 처럼 평면 import → 패키지 폴더를 경로에 추가
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
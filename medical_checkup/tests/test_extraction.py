@@ -0,0 +1,59 @@
+# test_extraction.py
+# 페이지별 추출 + 조기 종료: 모든 검사값을 찾은 뒤의 페이지는 요청하지 않아야 함
+
+import asyncio
+
+import pytest
+
+extraction = pytest.importorskip("extraction")
+import config
+import pipeline
+
+# 검사값은 앞 3페이지에 있고 뒤 7페이지는 무관한 내용
+PAGES = [
+    "혈색소 (g/dL) 13.5\n공복혈당 92",
+    "BMI 22.1\n허리둘레 78\nAST(SGOT) 21\nALT(SGPT) 18",
+    "감마GTP 25\n요단백 ■ 정상",
+] + [f"안내문 {i}" for i in range(7)]
+LAST_NEEDED = 2
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    calls = []
+
+    async def fake_run_cpu(fn, *args):
+        if fn is fake_extract_page:
+            calls.append(args[1])
+        return fn(*args)
+
+    def fake_extract_page(file_bytes, page_no):
+        return PAGES[page_no]
+
+    monkeypatch.setattr(extraction, "run_cpu", fake_run_cpu)
+    monkeypatch.setattr(extraction, "extract_pdf_page", fake_extract_page)
+    monkeypatch.setattr(extraction, "pdf_page_count", lambda file_bytes: len(PAGES))
+    return calls
+
+
+def test_match_fields_hemoglobin():
+    assert pipeline.match_fields("혈색소 (g/dL) 13.5") == {"혈색소": 13.5}
+
+
+def test_all_fields_found_in_first_pages():
+    result = pipeline.match_fields("\n".join(PAGES[:LAST_NEEDED + 1]))
+    assert pipeline.all_fields_found(result)
+
+
+@pytest.mark.parametrize("window", [1, 3])
+def test_extract_pdf_stops_after_last_needed_page(monkeypatch, requested, window):
+    monkeypatch.setattr(config, "PDF_PAGE_WINDOW", window)
+    result, text = asyncio.run(extraction.extract_fields(b"%PDF", "pdf"))
+
+    assert pipeline.all_fields_found(result)
+    assert "안내문" not in text
+    # 필요한 페이지는 모두 읽고, 그 뒤로는 window 만큼 미리 제출한 페이지까지만 (나머지는 요청 자체가 없음)
+    assert set(range(LAST_NEEDED + 1)) <= set(requested)
+    assert max(requested) < LAST_NEEDED + window
+    if window == 1:
+        assert requested == list(range(LAST_NEEDED + 1))
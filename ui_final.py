@@ -1,5 +1,5 @@
 import streamlit as st
-import json, time, random, pathlib
+import json, random, pathlib
 import pandas as pd
 from streamlit_lottie import st_lottie
 import requests
@@ -125,6 +125,21 @@ def render_main_buttons():
     render_uniform_button("신체 부위 기반 추천", "신체 부위 기반 추천")
     render_uniform_button("연령대 기반 추천", "연령대 기반 추천")
 
+# ────── 유틸: SSE 스트림 파싱 (event / data 쌍 단위로 반환) ──────
+def iter_sse(response):
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 loading_messages = [
     "🧬 건강 데이터를 정밀 분석하는 중입니다...",
     "🍃 당신의 건강을 위한 자연의 조합을 준비하고 있어요...",
@@ -252,38 +267,47 @@ elif st.session_state.page == "신체 부위 기반 추천":
     user_input = st.text_area(f"{body_part} 관련 건강 고민을 입력하세요", value=default_text)
 
     if st.button("추천 요청", key="run_bodypart") and user_input:
-        with st.spinner(random.choice(loading_messages)):
-            if lottie_health:
-                st_lottie(lottie_health, height=160)
-            time.sleep(1.5)
         try:
             # 3-1) 기능 매칭
-            match_res = requests.post(
-                f"{API_BASE}/bodypart/bodyfunction/match",
-                json={"body_part": body_part, "function": user_input},
-                timeout=TIMEOUT
-            )
-            match_res.raise_for_status()
-            matched_fn = match_res.json().get("matched_function", user_input)
-
-            # 3-2) 본 추천
-            rec_res = requests.post(
-                f"{API_BASE}/bodypart/recommend",
+            with st.spinner(random.choice(loading_messages)):
+                if lottie_health:
+                    st_lottie(lottie_health, height=160)
+                match_res = requests.post(
+                    f"{API_BASE}/bodypart/bodyfunction/match",
+                    json={"body_part": body_part, "function": user_input},
+                    timeout=TIMEOUT
+                )
+                match_res.raise_for_status()
+                matched_fn = match_res.json().get("matched_function", user_input)
+
+            # 3-2) 본 추천 (SSE 스트리밍: 예시 제품 먼저, 답변은 생성되는 대로 표시)
+            with requests.post(
+                f"{API_BASE}/bodypart/recommend/stream",
                 json={"body_part": body_part, "function": matched_fn},
-                timeout=TIMEOUT
-            )
-            rec_res.raise_for_status()
-            data = rec_res.json()
-
-            # 4) 결과 렌더링
-            st.success("✅ 추천 결과")
-            st.markdown(data.get("recommendation", "결과가 없습니다."))
-
-            # 예시 제품 표
-            if data.get("matched_supplements"):
-                st.markdown("#### 예시 제품")
-                st.dataframe(data["matched_supplements"], use_container_width=True)
-
+                timeout=TIMEOUT,
+                stream=True,
+            ) as rec_res:
+                rec_res.raise_for_status()
+
+                # 4) 결과 렌더링
+                st.success("✅ 추천 결과")
+                answer_box = st.empty()
+                answer_box.markdown("✍️ 추천 리포트를 작성하는 중입니다...")
+                answer = ""
+                for event, data in iter_sse(rec_res):
+                    if event == "context":
+                        # 예시 제품 표
+                        if data.get("matched_supplements"):
+                            st.markdown("#### 예시 제품")
+                            st.dataframe(data["matched_supplements"], use_container_width=True)
+                    elif event == "token":
+                        answer += data["text"]
+                        answer_box.markdown(answer + "▌")
+                    elif event == "done":
+                        answer = data.get("answer", answer)
+                    elif event == "error":
+                        st.error(f"답변 생성 중 오류: {data.get('detail')}")
+                answer_box.markdown(answer or "결과가 없습니다.")
 
         except Exception as e:
             st.error(f"API 호출 실패: {e}")